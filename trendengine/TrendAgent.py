@@ -1,141 +1,223 @@
+import argparse
 import os
-import math
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+# Loads .env once, before any module below reads its settings
+from config import env, OPENAI_API_KEY, GEMINI_API_KEY
 
 # ------------------------------
 # LLM CONFIG
 # ------------------------------
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-
 if not OPENAI_API_KEY:
     print("Missing OPENAI_API_KEY in .env")
 if not GEMINI_API_KEY:
     print("Missing GEMINI_API_KEY in .env")
 
 # ------------------------------
-# OPENAI CLIENT
-# ------------------------------
-from openai import OpenAI
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
-
-# ------------------------------
-# GEMINI CLIENT
+# LLM CLIENT (OpenAI + Gemini, async, with failover)
 # ------------------------------
-from llm.gemini_client import gemini_pro   # your working gemini wrapper
+from llm.client import llm_client, LLMError
+from llm.rate_limiter import RateLimiter
+from llm.cache import llm_cache
+from instrumentation import recorder, span
+from report_stream import ReportStream, REPORT_PATH
+from checkpoint import CHECKPOINT_DIR, RunCheckpoint, latest_run_id, prune_checkpoints, run_exists
 
 
 # ------------------------------
 # INGESTION SOURCES
 # ------------------------------
 
-from ingestion.news_api import fetch_news
-from ingestion.reddit_json import fetch_reddit_json
-from ingestion.amazon import fetch_amazon_best_sellers
-from ingestion.news_rss import fetch_google_news_rss, fetch_rss_feeds
-from ingestion.youtube import fetch_youtube_trending, fetch_youtube_reviews
+from ingestion.scheduler import IngestionScheduler
+from ingestion.entry_store import EntryStore
+from ingestion.seen_index import SeenIndex, track_newest
+from analysis.dedup import dedupe_entries, NearDuplicateIndex
+from analysis.batching import count_tokens, pack_batches, BatchPacker, MODEL_BATCH_TOKEN_BUDGETS
+from analysis.reduce import hierarchical_reduce
+from analysis.scoring import score_trends, format_score_table
+from analysis.history import TrendHistory, HISTORY_PATH
+from analysis.clustering import cluster_entries
+from ingestion.markets import MARKETS, parse_markets
+from ingestion.registry import QuotaLedger, load_sources, host_limits, release_tasks, schedule_sources
 
 
 # ------------------------------
 # CONFIG
 # ------------------------------
 
-CATEGORIES = [
-    "technology", "gadgets", "consumer electronics",
-    "AI", "smart home", "robotics"
-]
+# Every source with its fan-out, rate limit, quota and priority
+# (see sources.json and ingestion/registry.py)
+SOURCES = load_sources()
+
+# Batches are packed by prompt tokens, not item count (see analysis/batching.py)
+BATCH_TOKEN_BUDGET = MODEL_BATCH_TOKEN_BUDGETS["gpt-4.1-mini"]
+
+# Final refinement prompts under this many tokens go to GPT-4.1, larger to Gemini
+REFINEMENT_TOKEN_THRESHOLD = 5000
+
+# Ingestion concurrency: total in-flight requests and per-host caps
+INGEST_MAX_WORKERS = 16
+INGEST_PER_HOST_LIMIT = 4
+INGEST_HOST_LIMITS = host_limits(SOURCES)
+
+# Overlap analysis with collection: batches are sent as soon as they fill,
+# and all_entries is never materialized (see analyze_stream)
+STREAM_PIPELINE = False
+
+# Merge batch summaries in parallel levels before the final prompt, so it
+# stays under REFINEMENT_TOKEN_THRESHOLD (see analysis/reduce.py)
+HIERARCHICAL_REDUCE = True
+
+# Skip re-analysis of items seen in earlier runs (see ingestion/seen_index.py)
+INCREMENTAL = True
+
+# Send one representative per cluster of similar headlines to the batch LLM
+# instead of every headline (see analysis/clustering.py)
+SEMANTIC_CLUSTERING = True
+
+# Keep per-term counts of every run for rolling-window changes (see analysis/history.py)
+TREND_HISTORY = True
+
+# Optional Parquet snapshot of the collected entries (needs pyarrow)
+ENTRIES_PARQUET_PATH = env("TREND_ENTRIES_PARQUET")
 
-SUBREDDITS = [
-    "technology", "gadgets", "technews",
-    "hardware", "Apple", "Android", "HomeAutomation"
-]
+# Batch LLM concurrency and GPT-4.1-mini account limits
+LLM_MAX_WORKERS = 8
+OPENAI_MINI_RPM = 500
+OPENAI_MINI_TPM = 200_000
+MINI_EXPECTED_OUTPUT_TOKENS = 800
 
-BATCH_SIZE = 100
+# Provider routes: (provider, model) in failover order (see llm/client.py)
+MINI_ROUTE = [("openai", "gpt-4.1-mini"), ("gemini", "gemini-2.5-flash")]
+REFINE_ROUTE = [("openai", "gpt-4.1"), ("gemini", "gemini-2.5-pro")]
+LONG_CONTEXT_ROUTE = [("gemini", "gemini-2.5-pro"), ("openai", "gpt-4.1")]
+
+# Race a backup provider against a slow final refinement call
+HEDGE_REFINEMENT = True
+
+# Stream the final report to stdout and REPORT_PATH as it is generated
+STREAM_REPORT = True
+
+# Multi-market mode: one report per market (e.g. "DE,NL,ES"; see ingestion/markets.py).
+# Empty runs the original single report. Overridden by --markets.
+TARGET_MARKETS = parse_markets(env("TREND_MARKETS", ""))
+
+# Checkpoint entries, batch summaries and the final prompt under
+# .checkpoints/<run_id> so `--resume` can pick up an interrupted run
+CHECKPOINTS = True
+
+# Pace quota-billed sources (NewsAPI, YouTube) over their daily budgets,
+# tracked across runs in .cache/source_quota.sqlite3
+SOURCE_QUOTAS = True
+quota_ledger = QuotaLedger() if SOURCE_QUOTAS else None
 
 
 # ------------------------------
 # OPENAI MINI BATCH PROCESSOR
 # ------------------------------
 
+mini_rate_limiter = RateLimiter(rpm=OPENAI_MINI_RPM, tpm=OPENAI_MINI_TPM)
+trend_history = TrendHistory() if TREND_HISTORY else None
+
+# RunCheckpoint of the current run (set by _run_pipeline when CHECKPOINTS is on)
+run_checkpoint = None
+
+_market_histories = {}
+_market_histories_lock = threading.Lock()
+
+
+def market_history(market):
+    """Per-market TrendHistory, so one market's counts never move another's changes."""
+    if not TREND_HISTORY:
+        return None
+    with _market_histories_lock:
+        if market not in _market_histories:
+            path = os.path.join(os.path.dirname(HISTORY_PATH), f"trend_history_{market.lower()}.sqlite3")
+            _market_histories[market] = TrendHistory(path)
+        return _market_histories[market]
+
+
 def call_openai_mini(prompt):
-    """Use GPT-4.1-mini for affordable, fast headline grouping."""
-    for attempt in range(3):
+    """Use GPT-4.1-mini for affordable, fast headline grouping (Gemini Flash on failover)."""
+    if run_checkpoint is not None:
+        done = run_checkpoint.get_summary(prompt)
+        if done is not None:
+            return done
+
+    with span("gpt-4.1-mini", "llm_batch", model="gpt-4.1-mini") as s:
+        tokens = count_tokens(prompt) + MINI_EXPECTED_OUTPUT_TOKENS
         try:
-            resp = openai_client.responses.create(
-                model="gpt-4.1-mini",
-                input=prompt
+            model, text = llm_client.complete_sync(
+                prompt, MINI_ROUTE, span=s,
+                rate_limiters={"gpt-4.1-mini": mini_rate_limiter}, tokens=tokens,
             )
-            return resp.output_text
-        except Exception as e:
-            print(f"⚠️ GPT-4.1-mini failed attempt {attempt+1}: {e}")
-            time.sleep(2)
-    return "ERROR: GPT-4.1-mini failed after 3 attempts."
-
+        except LLMError as e:
+            s.error = str(e)
+            return f"ERROR: batch analysis failed on every provider ({e})"
+        s.set(model=model)
 
-# ------------------------------
-# GPT-4.1 REFINEMENT (used only for short prompts)
-# ------------------------------
-
-def call_openai_refinement(prompt):
-    try:
-        resp = openai_client.responses.create(
-            model="gpt-4.1",
-            input=prompt
-        )
-        return resp.output_text
-    except Exception as e:
-        return f"GPT-4.1 refinement error: {e}"
+    if run_checkpoint is not None:
+        run_checkpoint.add_summary(prompt, text)
+    return text
 
 
 # ------------------------------
 # HYBRID MODEL SELECTION LOGIC
 # ------------------------------
 
-def final_llm_analysis(prompt):
+def final_llm_analysis(prompt, report_stream=None):
     """
     AUTO MODEL SELECTION:
-    - Under 20k chars → GPT-4.1
-    - Over 20k chars  → Gemini-2.5-Pro (long-context)
+    - Under 5k tokens → GPT-4.1
+    - Over 5k tokens  → Gemini-2.5-Pro (long-context)
+
+    The other model is the failover (and, with HEDGE_REFINEMENT, the hedge).
+    With a ReportStream the answer is written to it token by token.
     """
-    length = len(prompt)
+    tokens = count_tokens(prompt)
 
-    if length < 20000:
+    if tokens < REFINEMENT_TOKEN_THRESHOLD:
         print("✨ Using GPT-4.1 (prompt is small)…")
-        return call_openai_refinement(prompt)
+        route = REFINE_ROUTE
+    else:
+        print("Using Gemini-2.5-Pro for long-context final analysis…")
+        route = LONG_CONTEXT_ROUTE
 
-    print("Using Gemini-2.5-Pro for long-context final analysis…")
-    return gemini_pro(prompt, model="gemini-2.5-pro")
+    with span(route[0][1], "llm_refine", model=route[0][1]) as s:
+        try:
+            model, text = llm_client.complete_sync(
+                prompt, route, hedged=HEDGE_REFINEMENT, span=s,
+                on_token=report_stream.write if report_stream else None,
+                on_restart=report_stream.restart if report_stream else None,
+            )
+        except LLMError as e:
+            s.error = str(e)
+            return f"Final refinement error: {e}"
+        s.set(model=model)
+        return text
 
 
 # ------------------------------
 # TREND ANALYSIS PIPELINE
 # ------------------------------
 
-def analyze_batched(all_entries):
-    titles = [e["title"] for e in all_entries if e["title"]]
+def format_headline(entry):
+    """Headline line for a batch prompt; duplicates collapsed into it show as (xN)."""
+    size = entry.get("cluster_size", 1)
+    return f"{entry['title']} (x{size})" if size > 1 else entry["title"]
 
-    total = len(titles)
-    print(f"\n🧩 Total items to analyze: {total}")
-
-    num_batches = math.ceil(total / BATCH_SIZE)
-    print(f"Processing {num_batches} batches of {BATCH_SIZE} items...\n")
-
-    batch_summaries = []
 
-    for i in range(num_batches):
-        batch_titles = titles[i * BATCH_SIZE : (i+1) * BATCH_SIZE]
-        batch_text = "\n".join([f"- {t}" for t in batch_titles])
+def build_batch_prompt(batch_titles):
+    batch_text = "\n".join([f"- {t}" for t in batch_titles])
 
-        mini_prompt = f"""
+    return f"""
 You are an expert trend classifier.
 
-Analyze these headlines:
+Analyze these headlines ("(xN)" = N related reports):
 
 {batch_text}
 
@@ -149,20 +231,191 @@ Extract:
 Return a tight summary. No fluff.
 """
 
-        print(f"⚡ Batch {i+1}/{num_batches}…")
-        summary = call_openai_mini(mini_prompt)
-        batch_summaries.append(summary)
 
-    combined = "\n\n".join(batch_summaries)
+def map_batches(prompts, label="Batch", max_workers=LLM_MAX_WORKERS):
+    """
+    Send batch prompts to GPT-4.1-mini concurrently.
+
+    Returns summaries in the same order as `prompts`.
+    """
+    num_batches = len(prompts)
+    if not num_batches:
+        return []
+
+    def run(indexed):
+        i, prompt = indexed
+        print(f"⚡ {label} {i+1}/{num_batches}…")
+        return call_openai_mini(prompt)
+
+    workers = max(1, min(max_workers, num_batches))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run, enumerate(prompts)))
+
+
+def score_entries(entries, market=None):
+    """Local trend scores for the refinement prompt (see analysis/scoring.py)."""
+    name = f"score_table_{market}" if market else "score_table"
+    if run_checkpoint is not None:
+        table = run_checkpoint.load_text(name)
+        if table is not None:   # already scored (and recorded in history) before the resume
+            return table
+
+    history = market_history(market) if market else trend_history
+    with span("score", "stage", market=market) as s:
+        rows = score_trends(entries, history=history)
+        s.add(items=len(rows))
+    print(f"📈 Scored {len(rows)} trend terms locally" + (f" for {market}" if market else ""))
+    table = format_score_table(rows)
+    if run_checkpoint is not None:
+        run_checkpoint.save_text(name, table)
+    return table
+
+
+def summarize_entries(entries, seen_index=None, scope=None):
+    """
+    Batch summaries for titled entries: skip already-seen items, cluster,
+    pack by token budget and map over GPT-4.1-mini.
+    """
+    # Incremental mode: only unseen items are sent to the LLM, earlier batch
+    # summaries stand in for the items we already analyzed. Partitioning
+    # before clustering keeps this independent of which member leads a cluster.
+    reused_summaries = []
+    if seen_index is not None:
+        entries, reused_summaries = seen_index.partition(entries, scope)
+        print(f"\n♻️ Reusing {len(reused_summaries)} prior batch summaries")
+
+    members = None
+    if SEMANTIC_CLUSTERING:
+        with span("cluster", "stage") as s:
+            entries, members = cluster_entries(entries, with_members=True)
+            s.add(items=len(entries))
+        print(f"🧲 Semantic clusters: {len(entries)}")
+
+    total = len(entries)
+    print(f"\n🧩 Total items to analyze: {total}")
+
+    # Fill each batch up to the model's token budget (minus the prompt template)
+    budget = BATCH_TOKEN_BUDGET - count_tokens(build_batch_prompt([]))
+    batches = pack_batches(entries, budget, label=format_headline)
+    print(f"Processing {len(batches)} batches of ≤{BATCH_TOKEN_BUDGET} tokens...\n")
+    prompts = [build_batch_prompt([format_headline(e) for e in batch]) for batch in batches]
+
+    # Batches run in parallel; summaries come back in batch order
+    new_summaries = map_batches(prompts)
+
+    if seen_index is not None:
+        for batch, summary in zip(batches, new_summaries):
+            if summary.startswith("ERROR:"):
+                continue
+            # Every member a representative stood for counts as analyzed
+            covered = [m for e in batch for m in members[e.index]] if members is not None else batch
+            seen_index.record_batch(covered, summary, scope)
+
+    return reused_summaries + new_summaries
+
+
+def analyze_batched(all_entries, seen_index=None, report_stream=None):
+    if not isinstance(all_entries, EntryStore):
+        all_entries = EntryStore(all_entries)
+    entries = all_entries.select(lambda e: e["title"])
+
+    # Scored over every item, including ones whose summaries are reused below
+    score_table = score_entries(entries)
+
+    batch_summaries = summarize_entries(entries, seen_index)
+    return refine_summaries(batch_summaries, score_table, report_stream)
 
+
+def analyze_stream(entry_stream, seen_index=None, max_in_flight=LLM_MAX_WORKERS * 2, report_stream=None):
+    """
+    Streaming counterpart of analyze_batched.
+
+    Consumes entries as fetchers yield them, collapses duplicates and skips
+    already-seen items on the fly, and dispatches each batch to GPT-4.1-mini
+    the moment it reaches the token budget. At most `max_in_flight` batches
+    are pending at once, so memory stays bounded however many sources run.
+    A representative's (xN) count reflects duplicates seen before its batch
+    was dispatched.
+    """
+    dedup = NearDuplicateIndex()
+    budget = BATCH_TOKEN_BUDGET - count_tokens(build_batch_prompt([]))
+    packer = BatchPacker(budget, label=format_headline)
+    reused_ids = set()
+    newest = {}
+    futures = []
+    collected = 0
+
+    def run_batch(i, batch):
+        print(f"⚡ Batch {i+1} ({len(batch)} items)…")
+        summary = call_openai_mini(build_batch_prompt([format_headline(e) for e in batch]))
+        if seen_index is not None and not summary.startswith("ERROR:"):
+            seen_index.record_batch(batch, summary)
+        return summary
+
+    def submit(pool, batch):
+        pending = [f for f in futures if not f.done()]
+        if len(pending) >= max_in_flight:
+            pending[0].result()   # backpressure on ingestion
+        futures.append(pool.submit(run_batch, len(futures), batch))
+
+    print("\n🌊 Streaming entries into LLM batches…")
+    with ThreadPoolExecutor(max_workers=LLM_MAX_WORKERS) as pool:
+        for entry in entry_stream:
+            collected += 1
+            if not entry["title"]:
+                continue
+            track_newest(newest, entry)
+
+            rep, is_new = dedup.add(entry)
+            if not is_new:
+                continue
+
+            if seen_index is not None:
+                summary_id = seen_index.summary_id_for(rep)
+                if summary_id is not None:
+                    reused_ids.add(summary_id)
+                    continue
+
+            full = packer.add(rep)
+            if full:
+                submit(pool, full)
+
+        last = packer.flush()
+        if last:
+            submit(pool, last)
+
+        new_summaries = [f.result() for f in futures]
+
+    print(f"\n📦 Total collected items: {collected}")
+    print(f"🧹 Unique after duplicate collapsing: {len(dedup.representatives)}")
+
+    reused_summaries = []
+    if seen_index is not None:
+        seen_index.advance_watermarks(newest)
+        reused_summaries = seen_index.get_summaries(reused_ids)
+        print(f"♻️ Reusing {len(reused_summaries)} prior batch summaries")
+
+    score_table = score_entries(dedup.representatives)
+    return refine_summaries(reused_summaries + new_summaries, score_table, report_stream)
+
+
+def build_refinement_prompt(combined, score_table="", market=None):
     # ------------------------------
     # FINAL HACKATHON-OPTIMIZED PROMPT
     # ------------------------------
 
-    refinement_prompt = f"""
+    market_focus = ""
+    if market:
+        market_focus = (
+            f"\nThis brief is for the {MARKETS[market]['name']} ({market}) market only: "
+            f"favour local news, local Amazon best sellers and local YouTube trends as evidence, "
+            f"and frame every recommendation for {MARKETS[market]['name']}.\n"
+        )
+
+    return f"""
 You are a senior market analyst preparing a professional trend intelligence brief
 for a major European consumer electronics retailer (MediaMarkt/Saturn style).
-
+{market_focus}
 The date today is **December 5, 2025**.
 Always use THIS date in the report header.
 
@@ -170,6 +423,14 @@ Use the insights below to generate a highly structured, retail-focused report:
 
 {combined}
 
+Locally computed trend scores (term | 0–100 score | status | mentions |
+platforms | velocity | source signal | change in mentions per run vs the
+previous 1h / 24h / 7d window, "–" = no history). These are measured, not
+estimated: use them for every trend's Trend Score and Status when it matches
+a term, and cite the changes as evidence.
+
+{score_table or "(no scores available)"}
+
 =========================
 ### FINAL TREND REPORT TEMPLATE
 =========================
@@ -192,8 +453,8 @@ For each trend, include:
 - Why It Is Rising  
 - Market Impact (EU retail context preferred)  
 - Evidence Snapshot (1–2 bullets from any platforms)  
-- Trend Score (0–100)  
-- Status (Rising / Stable / Cooling)
+- Trend Score (0–100, from the score table)  
+- Status (Rising / Stable / Cooling, from the score table)
 
 Keep each trend short, sharp, and retailer-actionable.
 
@@ -218,62 +479,360 @@ Concrete steps MediaMarkt/Saturn could execute:
 Generate the full finalized report.
 """
 
-    print("\n🧠 Running FINAL refinement…")
-    return final_llm_analysis(refinement_prompt)
+
+def refine_summaries(batch_summaries, score_table="", report_stream=None, market=None):
+    if HIERARCHICAL_REDUCE:
+        batch_summaries = hierarchical_reduce(batch_summaries, map_batches)
+
+    combined = "\n\n".join(batch_summaries)
+    refinement_prompt = build_refinement_prompt(combined, score_table, market)
+    if run_checkpoint is not None:
+        run_checkpoint.save_text(f"refine_prompt_{market}" if market else "refine_prompt", refinement_prompt)
+
+    print("\n🧠 Running FINAL refinement…" + (f" ({market})" if market else ""))
+    return final_llm_analysis(refinement_prompt, report_stream)
 
 
 # ------------------------------
 # MAIN ENGINE
 # ------------------------------
 
-def run_trend_engine():
-    print("\n🚀 Running Trend Engine…")
-    all_entries = []
+def build_scheduler(markets=None, sources=None, only_due=False, tag_source=False):
+    """
+    Queue every registered source on an IngestionScheduler.
+
+    Sources are added in priority order, within their quota budgets (see
+    ingestion/registry.py). With `markets`, each task is grouped under the
+    tuple of markets its entries count towards: region-independent sources
+    are fetched once for all markets, NewsAPI once per language and Amazon
+    once per storefront, Google News and YouTube Trending once per market.
+    """
+    scheduler = IngestionScheduler(
+        max_workers=INGEST_MAX_WORKERS,
+        per_host_limit=INGEST_PER_HOST_LIMIT,
+        host_limits=INGEST_HOST_LIMITS,
+    )
+    scheduled = schedule_sources(
+        scheduler, SOURCES if sources is None else sources,
+        ledger=quota_ledger, markets=markets, only_due=only_due, tag_source=tag_source,
+        incremental=INCREMENTAL,
+    )
+    if scheduled:
+        print("🗂️ Sources: " + ", ".join(f"{name} ×{n}" for name, n in scheduled.items()))
+    return scheduler
+
+
+# ------------------------------
+# MULTI-MARKET MODE
+# ------------------------------
+
+def report_path(market):
+    """trend_report_optimized_de.txt for market "DE"."""
+    base, ext = os.path.splitext(REPORT_PATH)
+    return f"{base}_{market.lower()}{ext}"
+
 
-    # 1 — NEWS API
-    for cat in CATEGORIES:
-        print(f"Fetching News: {cat}")
-        for n in fetch_news(cat):
-            all_entries.append({
-                "source": n.get("source", {}).get("name"),
-                "title": n.get("title"),
-                "text": f"{n.get('title')}\n\n{n.get('description')}",
-                "url": n.get("url"),
-                "published_at": n.get("publishedAt"),
-            })
+def _group_name(group):
+    return "entries_" + "-".join(group).lower()
 
-    # 2 — Reddit
-    all_entries.extend(fetch_reddit_json(SUBREDDITS, limit=50))
 
-    # 3 — Amazon Best Sellers
-    all_entries.extend(fetch_amazon_best_sellers())
+def _collect_groups(scheduler, checkpoint):
+    """{markets tuple: EntryStore} from every source, or from the checkpoint when resuming."""
+    names = list(dict.fromkeys(task[0] for task in scheduler.tasks))
+    if checkpoint is not None:
+        saved = {group: checkpoint.load_entries(_group_name(group)) for group in names}
+        if all(entries is not None for entries in saved.values()):
+            # Nothing is fetched, so the quota reserved for the calls goes back
+            release_tasks(scheduler.tasks)
+            scheduler.tasks = []
+            print(f"⏩ Resumed {sum(map(len, saved.values()))} collected items from checkpoint")
+            return saved
 
-    # 4 — Google News RSS
-    all_entries.extend(fetch_google_news_rss())
+    with span("ingest", "stage") as s:
+        groups = scheduler.run_groups()
+        s.add(items=sum(map(len, groups.values())))
+    print(f"⏱️ Ingestion finished in {s.wall_ms / 1000:.1f}s")
 
-    # 5 — Tech RSS Feeds
-    all_entries.extend(fetch_rss_feeds())
+    if checkpoint is not None:
+        for group, entries in groups.items():
+            checkpoint.save_entries(entries, _group_name(group))
+    return groups
 
-    # 6 — YouTube Trending
-    all_entries.extend(fetch_youtube_trending())
 
-    # 7 — YouTube Reviews
-    all_entries.extend(fetch_youtube_reviews())
+def regroup_by_markets(groups, markets):
+    """
+    Collapse duplicates across all source groups and file each story under
+    the markets whose sources reported it.
+
+    The same story from NewsAPI (de), Google News (DE) and a shared feed
+    is kept once, under ("DE", "AT") if it reached both markets, so every
+    market's entries are duplicate-free and no item is summarized twice.
+    """
+    index = NearDuplicateIndex()
+    reach = []   # representative row -> markets it reached
+    for group, entries in groups.items():
+        for entry in entries:
+            rep, is_new = index.add(entry)
+            if is_new:
+                reach.append(set(group))
+            else:
+                reach[rep.index].update(group)
+
+    order = {market: i for i, market in enumerate(markets)}
+    regrouped = {}
+    for rep, reached in zip(index.representatives, reach):
+        key = tuple(sorted(reached, key=order.__getitem__))
+        regrouped.setdefault(key, EntryStore()).append(rep)
+    print(f"🧹 After duplicate collapsing across sources: {len(index.representatives)}")
+    return regrouped
+
+
+def analyze_markets(groups, markets, seen_index=None, on_token=None):
+    """
+    One report per market from {markets tuple: EntryStore} source groups.
+
+    Stories are deduped across all groups and regrouped by the markets that
+    reported them (regroup_by_markets); each regrouped set is batch-summarized
+    once and a market's report is refined from the sets it belongs to, so
+    shared stories cost one set of batch calls however many markets run and
+    are scored once per market. Market scoring and refinement run in
+    parallel. Returns {market: report}.
+    """
+    with span("dedup", "stage") as s:
+        groups = regroup_by_markets(groups, markets)
+        s.add(items=sum(map(len, groups.values())))
+
+    titled, summaries = {}, {}
+    for group, entries in groups.items():
+        label = ",".join(group)
+        print(f"\n🌍 Market group [{label}]: {len(entries)} items")
+        if seen_index is not None:
+            seen_index.update_published_watermarks(entries)
+        titled[group] = entries.select(lambda e: e["title"])
+        with span("summarize", "stage", group=label):
+            # Scoped, so a summary is only ever reused for the same markets
+            summaries[group] = summarize_entries(titled[group], seen_index, scope=label)
+
+    def run_market(market):
+        if run_checkpoint is not None:
+            finished = run_checkpoint.load_text(f"report_{market}")
+            if finished is not None:
+                return finished
+
+        member_groups = [group for group in groups if market in group]
+        stream = None
+        if STREAM_REPORT:
+            emit = (lambda delta: on_token(delta, market=market)) if on_token else None
+            # Several reports streaming at once would interleave on stdout
+            stream = ReportStream(report_path(market), on_token=emit, echo=len(markets) == 1)
+
+        refine_prompt = run_checkpoint.load_text(f"refine_prompt_{market}") if run_checkpoint else None
+        if refine_prompt is not None:
+            report = final_llm_analysis(refine_prompt, stream)
+        else:
+            entries = EntryStore()
+            for group in member_groups:
+                entries.extend(titled[group])
+            score_table = score_entries(entries, market)
+            batch_summaries = [summary for group in member_groups for summary in summaries[group]]
+            report = refine_summaries(batch_summaries, score_table, stream, market)
+
+        if stream is not None:
+            stream.finish(report)
+        else:
+            with open(report_path(market), "w", encoding="utf-8") as f:
+                f.write(report)
+            print(f"Saved to {report_path(market)}")
+        if run_checkpoint is not None and not report.startswith("Final refinement error"):
+            run_checkpoint.save_text(f"report_{market}", report)
+        return report
+
+    with ThreadPoolExecutor(max_workers=len(markets)) as pool:
+        return dict(zip(markets, pool.map(run_market, markets)))
+
+
+def _run_markets(markets, on_token=None, checkpoint=None):
+    global run_checkpoint
+    run_checkpoint = checkpoint
+
+    print(f"🌍 Markets: {', '.join(markets)}")
+    if checkpoint is not None:
+        checkpoint.save_text("markets", ",".join(markets))
+        finished = {market: checkpoint.load_text(f"report_{market}") for market in markets}
+        if all(report is not None for report in finished.values()):
+            print("✅ Run already finished, reports are in " + ", ".join(map(report_path, markets)))
+            return finished
+    seen_index = SeenIndex() if INCREMENTAL else None
+
+    groups = _collect_groups(build_scheduler(markets), checkpoint)
+    with span("analyze", "stage"):
+        reports = analyze_markets(groups, markets, seen_index=seen_index, on_token=on_token)
+
+    for market in markets:
+        print(f"📝 {market}: {report_path(market)}")
+    print_cache_stats()
+    return reports
+
+
+# ------------------------------
+# MAIN ENTRY POINTS
+# ------------------------------
+
+def run_trend_engine(on_token=None, run_id=None, markets=None):
+    """
+    Run the whole pipeline and return the final report.
+
+    `on_token(delta)` receives the report as it streams (with STREAM_REPORT).
+    Passing the `run_id` of an earlier, interrupted run resumes it from its
+    checkpoint (FileNotFoundError if there is none).
+
+    With `markets` (default TARGET_MARKETS) one report is produced per
+    market and {market: report} is returned; `on_token` is then called as
+    on_token(delta, market=...).
+    """
+    print("\n🚀 Running Trend Engine…")
+    checkpoint = None
+    if CHECKPOINTS or run_id:
+        checkpoint = RunCheckpoint(run_id)
+        prune_checkpoints(keep=checkpoint.run_id)
+        print(f"🗂️ Checkpoint: {checkpoint.path}")
+
+    if markets is None:
+        saved = checkpoint.load_text("markets") if checkpoint is not None else None
+        markets = parse_markets(saved) if saved is not None else TARGET_MARKETS
+
+    recorder.start_run()
+    with span("run", "run"):
+        if markets:
+            final_report = _run_markets(markets, on_token, checkpoint)
+        else:
+            final_report = _run_pipeline(on_token, checkpoint)
+    recorder.print_summary()
+    return final_report
+
+
+def _collect_entries(checkpoint):
+    """All entries from every source, or the checkpointed ones when resuming."""
+    all_entries = checkpoint.load_entries() if checkpoint is not None else None
+    if all_entries is not None:
+        print(f"⏩ Resumed {len(all_entries)} collected items from checkpoint")
+        return all_entries
+
+    # All sources and their sub-requests run concurrently; entries are
+    # merged in registry order regardless of completion order.
+    scheduler = build_scheduler()
+    with span("ingest", "stage") as s:
+        all_entries = scheduler.run()
+        s.add(items=len(all_entries))
+    print(f"⏱️ Ingestion finished in {s.wall_ms / 1000:.1f}s")
 
     print(f"\n📦 Total collected items: {len(all_entries)}")
 
+    if checkpoint is not None:
+        checkpoint.save_entries(all_entries)
+    if ENTRIES_PARQUET_PATH:
+        all_entries.write_parquet(ENTRIES_PARQUET_PATH)
+        print(f"💾 Entries saved to {ENTRIES_PARQUET_PATH}")
+    return all_entries
+
+
+def _run_pipeline(on_token=None, checkpoint=None):
+    global run_checkpoint
+    run_checkpoint = checkpoint
+
+    seen_index = SeenIndex() if INCREMENTAL else None
+    report_stream = ReportStream(REPORT_PATH, on_token=on_token) if STREAM_REPORT else None
+
+    # Resume: skip every stage the checkpoint already holds
+    finished_report = checkpoint.load_text("report") if checkpoint is not None else None
+    refine_prompt = checkpoint.load_text("refine_prompt") if checkpoint is not None else None
+
+    if finished_report is not None:
+        print("✅ Run already finished, showing its report")
+        final_report = finished_report
+    elif refine_prompt is not None:
+        print("⏩ Resuming at the final refinement")
+        final_report = final_llm_analysis(refine_prompt, report_stream)
+    elif STREAM_PIPELINE:
+        # Entries are never materialized here: a resume re-fetches, but
+        # completed batches come back from the checkpoint / seen index
+        with span("stream", "stage"):
+            final_report = analyze_stream(
+                build_scheduler().stream(), seen_index=seen_index, report_stream=report_stream
+            )
+    else:
+        all_entries = _collect_entries(checkpoint)
+        final_report = analyze_collected(all_entries, seen_index, report_stream)
+
+    if checkpoint is not None and not final_report.startswith("Final refinement error"):
+        checkpoint.save_text("report", final_report)
+
+    write_report(final_report, report_stream)
+    print_cache_stats()
+    return final_report
+
+
+def analyze_collected(all_entries, seen_index=None, report_stream=None):
+    """Dedup collected entries, advance the seen-index watermarks and analyze them."""
+    # Collapse the same story arriving via NewsAPI / Google News / RSS
+    with span("dedup", "stage") as s:
+        all_entries = dedupe_entries(all_entries)
+        s.add(items=len(all_entries))
+    print(f"🧹 After duplicate collapsing: {len(all_entries)}")
+
+    if seen_index is not None:
+        seen_index.update_published_watermarks(all_entries)
+
     # Run analysis
-    final_report = analyze_batched(all_entries)
+    with span("analyze", "stage"):
+        return analyze_batched(all_entries, seen_index=seen_index, report_stream=report_stream)
+
+
+def write_report(final_report, report_stream=None, path=REPORT_PATH):
+    """Close the streamed report, or print and save it in one go."""
+    if report_stream is not None:
+        report_stream.finish(final_report)
+        return
 
     print("\n====================== FINAL TREND REPORT ======================\n")
     print(final_report)
     print("\n===============================================================\n")
 
-    with open("trend_report_optimized.txt", "w", encoding="utf-8") as f:
+    with open(path, "w", encoding="utf-8") as f:
         f.write(final_report)
 
-    print("Saved to trend_report_optimized.txt")
+    print(f"Saved to {path}")
+
+
+def print_cache_stats():
+    stats = llm_cache.stats()
+    print(f"💾 LLM cache: {stats['hits']} hits / {stats['misses']} misses ({stats['hit_rate']}% hit rate)")
 
 
 if __name__ == "__main__":
-    run_trend_engine()
+    parser = argparse.ArgumentParser(description="Collect, analyze and report consumer-tech trends.")
+    parser.add_argument(
+        "--resume", nargs="?", const="latest", metavar="RUN_ID",
+        help="resume an interrupted run from .checkpoints (default: the latest run)",
+    )
+    parser.add_argument(
+        "--markets", metavar="CODES",
+        help=f"comma-separated markets, one report each (known: {','.join(MARKETS)})",
+    )
+    args = parser.parse_args()
+
+    markets = None
+    if args.markets:
+        try:
+            markets = parse_markets(args.markets)
+        except ValueError as e:
+            parser.error(str(e))
+
+    resume_id = None
+    if args.resume:
+        resume_id = latest_run_id() if args.resume == "latest" else args.resume
+        if resume_id is None:
+            parser.error("no checkpointed run to resume")
+        if not run_exists(resume_id):
+            parser.error(f"no checkpointed run {resume_id!r} (see {CHECKPOINT_DIR}/)")
+    run_trend_engine(run_id=resume_id, markets=markets)
@@ -0,0 +1,93 @@
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:   # optional: fall back to a character heuristic
+    tiktoken = None
+
+# ------------------------------
+# TOKEN BUDGETS
+# ------------------------------
+
+# Prompt tokens per batch request; keeps each call near the model's sweet spot
+MODEL_BATCH_TOKEN_BUDGETS = {
+    "gpt-4.1-mini": 3000,
+}
+DEFAULT_BATCH_TOKEN_BUDGET = 3000
+
+TIKTOKEN_ENCODING = "o200k_base"   # GPT-4.1 family
+CHARS_PER_TOKEN = 4
+
+_encoding = None
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None and tiktoken is not None:
+        _encoding = tiktoken.get_encoding(TIKTOKEN_ENCODING)
+    return _encoding
+
+
+def count_tokens(text):
+    """Token count of `text` (exact with tiktoken, ~4 chars/token otherwise)."""
+    if not text:
+        return 0
+    enc = _get_encoding()
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+@lru_cache(maxsize=100_000)
+def count_line_tokens(line):
+    """Cached token count of one headline line ("- title\\n")."""
+    return count_tokens(f"- {line}\n")
+
+
+class BatchPacker:
+    """
+    Greedily fills batches up to a token budget.
+
+    `add()` returns a completed batch when the next item would overflow the
+    current one, otherwise None; `flush()` returns whatever is left. A single
+    item larger than the budget still gets its own batch.
+    """
+
+    def __init__(self, token_budget=DEFAULT_BATCH_TOKEN_BUDGET, label=lambda e: e["title"]):
+        self.token_budget = token_budget
+        self.label = label
+        self._batch = []
+        self._tokens = 0
+
+    def add(self, entry):
+        tokens = count_line_tokens(self.label(entry))
+        full = None
+        if self._batch and self._tokens + tokens > self.token_budget:
+            full = self.flush()
+        self._batch.append(entry)
+        self._tokens += tokens
+        return full
+
+    def flush(self):
+        batch, self._batch, self._tokens = self._batch, [], 0
+        return batch or None
+
+
+def pack_batches(entries, token_budget=DEFAULT_BATCH_TOKEN_BUDGET, label=lambda e: e["title"]):
+    """
+    Split entries into token-bounded batches, preserving order.
+
+    Batches are contiguous slices of `entries`, so an EntryStore is split
+    into zero-copy views instead of copied lists.
+    """
+    bounds = []
+    start, tokens = 0, 0
+    for i, entry in enumerate(entries):
+        line_tokens = count_line_tokens(label(entry))
+        if i > start and tokens + line_tokens > token_budget:
+            bounds.append((start, i))
+            start, tokens = i, 0
+        tokens += line_tokens
+    if start < len(entries):
+        bounds.append((start, len(entries)))
+    return [entries[a:b] for a, b in bounds]
@@ -0,0 +1,135 @@
+import numpy as np
+
+from analysis.embeddings import embed_texts, backend_name
+from ingestion.entry_store import EntryStore
+
+# ------------------------------
+# CLUSTERING CONFIG
+# ------------------------------
+
+# Cosine similarity to a cluster's leader needed to join it
+SIMILARITY_THRESHOLDS = {
+    "hashing": 0.6,      # lexical vectors: roughly half the keywords shared
+}
+DEFAULT_SIMILARITY_THRESHOLD = 0.75
+
+# Random-hyperplane LSH: more tables / probes = better recall, more bits = fewer candidates
+LSH_TABLES = 16
+LSH_BITS = 12
+LSH_PROBES = 3       # extra buckets per table: flip each of the least certain bits
+LSH_SEED = 13
+
+
+class RandomProjectionIndex:
+    """
+    Approximate nearest-neighbour index over unit vectors.
+
+    Each of `tables` hash tables buckets a vector by the signs of its dot
+    products with `bits` random hyperplanes; vectors at a small angle share
+    a bucket in at least one table with high probability, so a query only
+    scores the few items in its buckets instead of the whole index. Queries
+    also probe the neighbouring buckets across the `probes` hyperplanes the
+    vector lies closest to (multi-probe LSH), which buys recall without
+    adding tables.
+    """
+
+    def __init__(self, dim, tables=LSH_TABLES, bits=LSH_BITS, probes=LSH_PROBES, seed=LSH_SEED):
+        rng = np.random.default_rng(seed)
+        self.tables = tables
+        self.bits = bits
+        self.probes = probes
+        self.planes = rng.standard_normal((tables * bits, dim)).astype(np.float32)
+        self._powers = 1 << np.arange(bits, dtype=np.int64)
+        self._buckets = [{} for _ in range(tables)]
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self._size = 0
+
+    def project(self, vectors):
+        """(n, tables, bits) hyperplane projections for a matrix of vectors."""
+        return (vectors @ self.planes.T).reshape(len(vectors), self.tables, self.bits)
+
+    def _keys(self, projection):
+        return (projection > 0) @ self._powers
+
+    def add(self, vector, projection):
+        if self._size == len(self.vectors):   # grow the vector matrix geometrically
+            grown = np.zeros((max(64, 2 * self._size), self.vectors.shape[1]), dtype=np.float32)
+            grown[:self._size] = self.vectors[:self._size]
+            self.vectors = grown
+        idx = self._size
+        self.vectors[idx] = vector
+        self._size += 1
+        for table, key in enumerate(self._keys(projection).tolist()):
+            self._buckets[table].setdefault(key, []).append(idx)
+        return idx
+
+    def nearest(self, vector, projection):
+        """(index, cosine) of the best candidate in a probed bucket, or (None, -1)."""
+        keys = self._keys(projection)
+        uncertain = np.argsort(np.abs(projection), axis=1)[:, :self.probes]
+        probes = np.hstack([keys[:, None], keys[:, None] ^ self._powers[uncertain]])
+        candidates = set()
+        for table, table_keys in enumerate(probes.tolist()):
+            buckets = self._buckets[table]
+            for key in table_keys:
+                candidates.update(buckets.get(key, ()))
+        if not candidates:
+            return None, -1.0
+        idx = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        sims = self.vectors[idx] @ vector
+        best = int(np.argmax(sims))
+        return int(idx[best]), float(sims[best])
+
+
+def cluster_entries(entries, threshold=None, with_members=False):
+    """
+    Group semantically similar headlines; returns an EntryStore of one
+    representative per cluster, in first-seen order.
+
+    Entries are visited most-reported first (by dedup `cluster_size`), so
+    the best-covered story of a trend becomes its representative. Each
+    representative's `cluster_size` is the sum over its members, which
+    format_headline shows as "(xN)".
+
+    With `with_members`, returns (representatives, members) where
+    members[i] lists the input entries folded into representative i
+    (itself included), e.g. to mark all of them as analyzed.
+    """
+    store = entries if isinstance(entries, EntryStore) else EntryStore(entries)
+    if not len(store):
+        return (EntryStore(), []) if with_members else EntryStore()
+
+    if threshold is None:
+        threshold = SIMILARITY_THRESHOLDS.get(backend_name(), DEFAULT_SIMILARITY_THRESHOLD)
+
+    vectors = embed_texts(t or "" for t in store.titles)
+    index = RandomProjectionIndex(vectors.shape[1])
+    projections = index.project(vectors)
+
+    sizes = np.asarray(store.cluster_sizes, dtype=np.int64)
+    has_vector = np.linalg.norm(vectors, axis=1) > 0
+    leaders = []       # store row of each cluster's leader
+    totals = []        # summed cluster_size per cluster
+    rows = []          # store rows per cluster
+    cluster_of = []    # index id -> cluster
+
+    for i in np.argsort(-sizes, kind="stable").tolist():
+        if has_vector[i]:
+            found, similarity = index.nearest(vectors[i], projections[i])
+            if found is not None and similarity >= threshold:
+                totals[cluster_of[found]] += int(sizes[i])
+                rows[cluster_of[found]].append(i)
+                continue
+            index.add(vectors[i], projections[i])
+            cluster_of.append(len(leaders))
+        # No usable vector (e.g. only stopwords): always its own cluster
+        leaders.append(i)
+        totals.append(int(sizes[i]))
+        rows.append([i])
+
+    representatives, members = EntryStore(), []
+    for cluster in sorted(range(len(leaders)), key=leaders.__getitem__):
+        rep = representatives.append(store[leaders[cluster]])
+        rep["cluster_size"] = totals[cluster]
+        members.append([store[j] for j in rows[cluster]])
+    return (representatives, members) if with_members else representatives
@@ -0,0 +1,131 @@
+import hashlib
+import re
+from functools import lru_cache
+
+from ingestion.entry_store import EntryStore
+from ingestion.seen_index import normalize_url
+
+# ------------------------------
+# SIMHASH CONFIG
+# ------------------------------
+
+HASH_BITS = 64
+NUM_BANDS = 4                       # 4 x 16-bit bands
+BAND_BITS = HASH_BITS // NUM_BANDS
+MAX_HAMMING_DISTANCE = 3            # < NUM_BANDS, so near-dups always share a band
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an the and or of to in on for with at by from is are was be as its it this that new".split()
+)
+# "Headline text - The Verge" / "Headline | Engadget"
+_PUBLISHER_SUFFIX_RE = re.compile(r"\s+[-|–—]\s+[^-|–—]{1,40}$")
+
+
+def _features(text):
+    text = _PUBLISHER_SUFFIX_RE.sub("", text or "").lower()
+    words = [w for w in _WORD_RE.findall(text) if w not in _STOPWORDS]
+    # unigrams + bigrams; bigrams keep word order from being ignored entirely
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    return features[:255]   # per-bit counters below are 8-bit lanes
+
+
+# Byte value -> 64-bit int with each of its 8 bits moved into its own byte
+_SPREAD_BYTE = [
+    sum(((b >> i) & 1) << (8 * i) for i in range(8)) for b in range(256)
+]
+
+
+@lru_cache(maxsize=200_000)
+def _spread_hash(feature):
+    """Feature hash with every bit widened to an 8-bit lane of a 512-bit int."""
+    h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+    spread = 0
+    for k in range(HASH_BITS // 8):
+        spread |= _SPREAD_BYTE[(h >> (8 * k)) & 0xFF] << (64 * k)
+    return spread
+
+
+def simhash(text):
+    """64-bit SimHash fingerprint of a headline."""
+    features = _features(text)
+    # Summing widened hashes counts the set bits of every position at once
+    counts = sum(_spread_hash(f) for f in features).to_bytes(HASH_BITS, "little")
+
+    fingerprint = 0
+    for bit, ones in enumerate(counts):
+        if 2 * ones > len(features):
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def _bands(fingerprint):
+    mask = (1 << BAND_BITS) - 1
+    return [(i, (fingerprint >> (i * BAND_BITS)) & mask) for i in range(NUM_BANDS)]
+
+
+class NearDuplicateIndex:
+    """
+    Incremental collapser for exact-URL and near-duplicate headlines.
+
+    Fingerprints are split into bands and bucketed (LSH), so each new entry
+    is only compared against the few representatives sharing a band instead
+    of every entry seen so far. Each kept representative carries a
+    `cluster_size` count of how many entries it absorbed. Representatives
+    are kept in an EntryStore.
+    """
+
+    def __init__(self, max_distance=MAX_HAMMING_DISTANCE):
+        self.max_distance = max_distance
+        self.representatives = EntryStore()
+        self._fingerprints = []
+        self._by_url = {}
+        self._buckets = {}
+
+    def _find(self, fingerprint):
+        for band in _bands(fingerprint):
+            for idx in self._buckets.get(band, ()):
+                if bin(self._fingerprints[idx] ^ fingerprint).count("1") <= self.max_distance:
+                    return idx
+        return None
+
+    def add(self, entry):
+        """
+        Add an entry; returns (representative, is_new).
+
+        A duplicate bumps its representative's `cluster_size` and is dropped.
+        """
+        url = normalize_url(entry["url"]) if entry.get("url") else None
+        idx = self._by_url.get(url) if url else None
+
+        fingerprint = None
+        if idx is None:
+            fingerprint = simhash(entry.get("title") or entry.get("text") or "")
+            if fingerprint:
+                idx = self._find(fingerprint)
+
+        if idx is not None:
+            rep = self.representatives[idx]
+            rep["cluster_size"] += 1
+            if url:
+                self._by_url.setdefault(url, idx)
+            return rep, False
+
+        idx = len(self.representatives)
+        rep = self.representatives.append(entry)
+        rep["cluster_size"] = 1
+        self._fingerprints.append(fingerprint)
+        if url:
+            self._by_url[url] = idx
+        if fingerprint:
+            for band in _bands(fingerprint):
+                self._buckets.setdefault(band, []).append(idx)
+        return rep, True
+
+
+def dedupe_entries(entries, max_distance=MAX_HAMMING_DISTANCE):
+    """Collapse duplicates; returns an EntryStore of representatives in first-seen order."""
+    index = NearDuplicateIndex(max_distance)
+    for entry in entries:
+        index.add(entry)
+    return index.representatives
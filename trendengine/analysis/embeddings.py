@@ -0,0 +1,155 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from analysis.scoring import extract_terms
+from config import env
+
+# ------------------------------
+# EMBEDDING CONFIG
+# ------------------------------
+
+# "auto" uses sentence-transformers when installed, else hashed term vectors
+EMBEDDING_BACKEND = env("EMBEDDING_BACKEND", "auto")
+EMBEDDING_MODEL = env("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_BATCH_SIZE = 256
+EMBEDDING_CACHE_PATH = env("EMBEDDING_CACHE_PATH", os.path.join(".cache", "embeddings.sqlite3"))
+
+HASH_DIM = 512
+
+
+class EmbeddingCache:
+    """On-disk float32 vectors keyed by sha1(model + text)."""
+
+    def __init__(self, path=EMBEDDING_CACHE_PATH):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS vectors ("
+                " key TEXT PRIMARY KEY,"
+                " vector BLOB NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def key(model, text):
+        return hashlib.sha1(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, model, texts):
+        """{text: vector} for the texts already embedded with `model`."""
+        keys = {self.key(model, t): t for t in texts}
+        found = {}
+        with self._lock:
+            db = self._db()
+            key_list = list(keys)
+            for start in range(0, len(key_list), 500):
+                chunk = key_list[start:start + 500]
+                for key, blob in db.execute(
+                    f"SELECT key, vector FROM vectors WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ):
+                    found[keys[key]] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def set_many(self, model, vectors):
+        """Store {text: vector}."""
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.executemany(
+                "INSERT OR REPLACE INTO vectors (key, vector, created_at) VALUES (?, ?, ?)",
+                [(self.key(model, t), np.asarray(v, dtype=np.float32).tobytes(), now)
+                 for t, v in vectors.items()],
+            )
+            db.commit()
+
+
+embedding_cache = EmbeddingCache()
+
+
+# ------------------------------
+# BACKENDS
+# ------------------------------
+
+def hashing_embed(texts, dim=HASH_DIM):
+    """
+    Signed feature-hashing vectors of each title's keyword unigrams and
+    bigrams. Lexical rather than semantic, but needs no model and is cheap
+    enough that it is never cached.
+    """
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for i, text in enumerate(texts):
+        for term in extract_terms(text):
+            h = zlib.crc32(term.encode("utf-8"))
+            vectors[i, h % dim] += 1.0 if h & 0x80000000 else -1.0
+    return vectors
+
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def _load_sentence_model():
+    """The sentence-transformers model, or None if the package is missing."""
+    global _model
+    with _model_lock:
+        if _model is None:
+            try:
+                from sentence_transformers import SentenceTransformer   # heavy (torch); import on demand
+            except ImportError:
+                return None
+            _model = SentenceTransformer(EMBEDDING_MODEL, device="cpu")
+        return _model
+
+
+def backend_name():
+    if EMBEDDING_BACKEND == "hashing":
+        return "hashing"
+    if _load_sentence_model() is not None:
+        return EMBEDDING_MODEL
+    if EMBEDDING_BACKEND == "sentence-transformers":
+        raise ImportError("EMBEDDING_BACKEND=sentence-transformers needs `pip install sentence-transformers`")
+    return "hashing"
+
+
+def embed_texts(texts, cache=None):
+    """
+    L2-normalized float32 embeddings, one row per text.
+
+    Model embeddings are looked up in (and added to) the on-disk cache so
+    each distinct title is only encoded once across runs.
+    """
+    texts = list(texts)
+    name = backend_name()
+
+    if name == "hashing":
+        vectors = hashing_embed(texts)
+    else:
+        cache = cache or embedding_cache
+        known = cache.get_many(name, set(texts))
+        missing = sorted({t for t in texts if t not in known})
+        if missing:
+            encoded = _load_sentence_model().encode(
+                missing, batch_size=EMBEDDING_BATCH_SIZE, convert_to_numpy=True, show_progress_bar=False
+            )
+            fresh = dict(zip(missing, encoded.astype(np.float32)))
+            cache.set_many(name, fresh)
+            known.update(fresh)
+        vectors = np.vstack([known[t] for t in texts]) if texts else np.zeros((0, 1), np.float32)
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
@@ -0,0 +1,157 @@
+import os
+import sqlite3
+import threading
+import time
+
+from config import env
+
+# ------------------------------
+# HISTORY CONFIG
+# ------------------------------
+
+HISTORY_PATH = env("TREND_HISTORY_PATH", os.path.join(".cache", "trend_history.sqlite3"))
+HISTORY_RETENTION_SECONDS = 180 * 24 * 3600
+
+# Terms mentioned fewer times than this in a run are not stored
+HISTORY_MIN_MENTIONS = 2
+
+# Rolling windows: each compares (now - w, now] with the window before it
+WINDOWS = {
+    "1h": 3600,
+    "24h": 24 * 3600,
+    "7d": 7 * 24 * 3600,
+}
+
+
+class TrendHistory:
+    """
+    Append-only time series of per-term, per-platform mention counts.
+
+    Every run adds one row per (term, platform) at the run's timestamp.
+    Rows are clustered by term, so rolling-window queries for the handful
+    of terms in a report touch only their own rows however many months of
+    runs are stored. Counts are averaged per run inside each window, which
+    keeps percent changes meaningful if the run cadence changes.
+    """
+
+    def __init__(self, path=HISTORY_PATH, retention=HISTORY_RETENTION_SECONDS):
+        self.path = path
+        self.retention = retention
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS runs (
+                    ts INTEGER PRIMARY KEY
+                );
+                CREATE TABLE IF NOT EXISTS terms (
+                    id INTEGER PRIMARY KEY,
+                    term TEXT UNIQUE NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS term_counts (
+                    term_id INTEGER NOT NULL,
+                    ts INTEGER NOT NULL,
+                    platform TEXT NOT NULL,
+                    count REAL NOT NULL,
+                    PRIMARY KEY (term_id, ts, platform)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS term_counts_ts ON term_counts(ts);
+            """)
+        return self._conn
+
+    def _term_ids(self, db, terms):
+        db.executemany("INSERT OR IGNORE INTO terms (term) VALUES (?)", [(t,) for t in terms])
+        ids = {}
+        terms = list(terms)
+        for start in range(0, len(terms), 500):   # SQLite host-parameter limit
+            chunk = terms[start:start + 500]
+            rows = db.execute(
+                f"SELECT term, id FROM terms WHERE term IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            ids.update(rows)
+        return ids
+
+    def record_run(self, counts, run_at=None):
+        """
+        Append one run: `counts` is an iterable of (term, platform, count).
+
+        Returns the run timestamp. Rows older than the retention window are
+        pruned in the same transaction.
+        """
+        ts = int(run_at if run_at is not None else time.time())
+        counts = [(term, platform, float(n)) for term, platform, n in counts if n]
+        with self._lock:
+            db = self._db()
+            ids = self._term_ids(db, {term for term, _, _ in counts})
+            db.execute("INSERT OR IGNORE INTO runs (ts) VALUES (?)", (ts,))
+            db.executemany(
+                "INSERT INTO term_counts (term_id, ts, platform, count) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(term_id, ts, platform) DO UPDATE SET count = count + excluded.count",
+                [(ids[term], ts, platform, n) for term, platform, n in counts],
+            )
+            cutoff = ts - self.retention
+            db.execute("DELETE FROM term_counts WHERE ts < ?", (cutoff,))
+            db.execute("DELETE FROM runs WHERE ts < ?", (cutoff,))
+            db.commit()
+        return ts
+
+    def _runs_between(self, db, start, end):
+        return db.execute("SELECT COUNT(*) FROM runs WHERE ts > ? AND ts <= ?", (start, end)).fetchone()[0]
+
+    def window_averages(self, terms, window, now=None):
+        """
+        {term: (current, previous)} mean mentions per run in the last `window`
+        seconds and in the window before it (None when that window has no runs).
+        """
+        now = int(now if now is not None else time.time())
+        mid, start = now - window, now - 2 * window
+        with self._lock:
+            db = self._db()
+            runs_now = self._runs_between(db, mid, now)
+            runs_before = self._runs_between(db, start, mid)
+            ids = dict(db.execute(
+                f"SELECT id, term FROM terms WHERE term IN ({','.join('?' * len(terms))})", list(terms)
+            ).fetchall()) if terms else {}
+            sums = {}
+            for term_id, term in ids.items():
+                sums[term] = db.execute(
+                    "SELECT COALESCE(SUM(CASE WHEN ts > ? THEN count END), 0),"
+                    "       COALESCE(SUM(CASE WHEN ts <= ? THEN count END), 0) "
+                    "FROM term_counts WHERE term_id = ? AND ts > ? AND ts <= ?",
+                    (mid, mid, term_id, start, now),
+                ).fetchone()
+
+        averages = {}
+        for term in terms:
+            current, previous = sums.get(term, (0, 0))
+            averages[term] = (
+                current / runs_now if runs_now else None,
+                previous / runs_before if runs_before else None,
+            )
+        return averages
+
+    def changes(self, terms, windows=WINDOWS, now=None):
+        """{term: {window name: percent change vs the previous window, or None}}."""
+        result = {term: {} for term in terms}
+        for name, seconds in windows.items():
+            for term, (current, previous) in self.window_averages(terms, seconds, now).items():
+                if current is None or not previous:
+                    result[term][name] = None
+                else:
+                    result[term][name] = round((current - previous) / previous * 100, 1)
+        return result
+
+    def series(self, term, since=None):
+        """[(ts, total count)] per stored run for one term, oldest first."""
+        with self._lock:
+            return self._db().execute(
+                "SELECT c.ts, SUM(c.count) FROM term_counts c JOIN terms t ON t.id = c.term_id "
+                "WHERE t.term = ? AND c.ts >= ? GROUP BY c.ts ORDER BY c.ts",
+                (term, since or 0),
+            ).fetchall()
@@ -0,0 +1,88 @@
+from analysis.batching import count_tokens
+
+# ------------------------------
+# REDUCE CONFIG
+# ------------------------------
+
+# Combined summaries must fit this many tokens before the final template
+REDUCE_TARGET_TOKENS = 4000
+# Input tokens per merge call
+REDUCE_GROUP_TOKENS = 6000
+MAX_REDUCE_LEVELS = 6
+
+
+def build_merge_prompt(summaries):
+    joined = "\n\n---\n\n".join(summaries)
+
+    return f"""
+You are an expert trend analyst consolidating partial trend summaries.
+
+Merge these summaries into ONE tight summary:
+
+{joined}
+
+Rules:
+- Combine overlapping trends; keep distinct ones
+- Keep product mentions, categories and sentiment direction
+- Note when a trend appears in several summaries (stronger signal)
+- Keep the 3–5 most actionable insights overall
+
+Return a tight summary. No fluff.
+"""
+
+
+def group_by_tokens(summaries, group_tokens=REDUCE_GROUP_TOKENS):
+    """Split summaries into consecutive groups of at most `group_tokens` (min 2 per group)."""
+    groups = []
+    current, current_tokens = [], 0
+    for summary in summaries:
+        tokens = count_tokens(summary)
+        if len(current) >= 2 and current_tokens + tokens > group_tokens:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(summary)
+        current_tokens += tokens
+    if current:
+        # A lone trailing summary joins the previous group instead of costing a call
+        if len(current) == 1 and groups:
+            groups[-1].extend(current)
+        else:
+            groups.append(current)
+    return groups
+
+
+def hierarchical_reduce(summaries, map_prompts, target_tokens=REDUCE_TARGET_TOKENS,
+                        group_tokens=REDUCE_GROUP_TOKENS, max_levels=MAX_REDUCE_LEVELS):
+    """
+    Merge summaries level by level until they fit `target_tokens`.
+
+    Each level packs summaries into token-bounded groups and merges every
+    group with one LLM call; `map_prompts(prompts, label)` runs the calls in
+    parallel and returns results in order. The number of levels grows
+    logarithmically with the number of batches.
+    """
+    summaries = [s for s in summaries if s and not s.startswith("ERROR:")]
+
+    level = 0
+    while (
+        len(summaries) > 1
+        and level < max_levels
+        and sum(count_tokens(s) for s in summaries) > target_tokens
+    ):
+        level += 1
+        groups = group_by_tokens(summaries, group_tokens)
+        print(f"🪜 Reduce level {level}: {len(summaries)} summaries → {len(groups)} merges")
+        merged = map_prompts([build_merge_prompt(g) for g in groups], f"Merge L{level}")
+        failed = sum(m.startswith("ERROR:") for m in merged)
+        if failed == len(merged):
+            print("⚠️ All merge calls failed; refining unreduced summaries")
+            break
+        if failed:
+            print(f"⚠️ {failed} merge calls failed; keeping their input summaries unmerged")
+        # A failed merge must not drop its group's batches from the report
+        summaries = [
+            "\n\n".join(g) if m.startswith("ERROR:") else m
+            for m, g in zip(merged, groups)
+        ]
+
+    return summaries
@@ -0,0 +1,255 @@
+import re
+
+import numpy as np
+
+from analysis.history import HISTORY_MIN_MENTIONS
+from ingestion.entry_store import EntryStore, NO_TIMESTAMP
+
+# ------------------------------
+# SCORING CONFIG
+# ------------------------------
+
+TOP_TERMS = 25
+MIN_TERM_MENTIONS = 3
+
+# Velocity compares a term's share of recent mentions with its share of the
+# mentions before that (both windows end at the newest timestamp in the data)
+RECENT_WINDOW_SECONDS = 24 * 3600
+BASELINE_WINDOW_SECONDS = 7 * 24 * 3600
+MIN_BASELINE_MENTIONS = 20      # less history than this: every term is Stable
+RISING_THRESHOLD = 0.5          # log2 share ratio, i.e. ~+41%
+COOLING_THRESHOLD = -0.5
+# With stored history, status comes from the 24h per-run mention change (%)
+HISTORY_STATUS_WINDOW = "24h"
+HISTORY_RISING_PCT = 25
+HISTORY_COOLING_PCT = -25
+
+# A term overlapping a higher-ranked one ("vision" / "vision pro") is dropped
+# when it mostly co-occurs with it, i.e. its mentions are within this ratio
+OVERLAP_MENTION_RATIO = 0.6
+
+# Weights of the 0–1 components in the 0–100 score
+SCORE_WEIGHTS = {
+    "frequency": 0.40,
+    "spread": 0.25,
+    "velocity": 0.20,
+    "signal": 0.15,
+}
+
+PLATFORMS = ("news", "google_news", "rss", "reddit", "youtube", "amazon", "producthunt", "shopping")
+
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9+.\-]*[a-z0-9+]|[a-z0-9]")
+_STOPWORDS = frozenset("""
+    a an the and or but of to in on for with at by from into over about after before
+    is are was were be been being has have had do does did will would can could should may
+    it its this that these those there here what which who whom whose why how when where
+    i you your we our they their he she his her them us me my not no yes all any more most
+    new now just get gets got out up down off than then so as if vs via says said
+    review reviews video watch best top first one two three year years today week update
+""".split())
+# "Headline text - The Verge" / "Headline | Engadget"
+_PUBLISHER_SUFFIX_RE = re.compile(r"\s+[-|–—]\s+[^-|–—]{1,40}$")
+
+
+def platform_of(source):
+    """Collapse a source name (e.g. "reddit/gadgets", a feed URL) into its platform."""
+    source = source or ""
+    if source.startswith("reddit/"):
+        return "reddit"
+    if source.startswith("youtube"):
+        return "youtube"
+    if source.startswith("google_shopping"):
+        return "shopping"
+    if source.startswith("http"):
+        return "rss"
+    if source == "GoogleNews":
+        return "google_news"
+    if source in ("amazon", "producthunt"):
+        return source
+    return "news"   # NewsAPI publisher names
+
+
+def extract_terms(title):
+    """Distinct keyword unigrams and bigrams of a headline."""
+    text = _PUBLISHER_SUFFIX_RE.sub("", title or "").lower()
+    words = [w for w in _WORD_RE.findall(text) if w not in _STOPWORDS and not w.isdigit()]
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+# ------------------------------
+# SCORING
+# ------------------------------
+
+def _term_matrix(store):
+    """(vocab, term_ids, entry_ids): one pair per distinct term in each title."""
+    vocab = {}
+    term_ids, entry_ids = [], []
+    for i, title in enumerate(store.titles):
+        for term in extract_terms(title):
+            term_ids.append(vocab.setdefault(term, len(vocab)))
+            entry_ids.append(i)
+    return list(vocab), np.array(term_ids, dtype=np.int64), np.array(entry_ids, dtype=np.int64)
+
+
+def _source_signal(signals, platforms):
+    """Per-entry signal as its percentile (0–1) within its platform; NaN stays NaN."""
+    normalized = np.full(len(signals), np.nan)
+    for platform in np.unique(platforms):
+        idx = np.flatnonzero((platforms == platform) & ~np.isnan(signals))
+        if len(idx) == 1:
+            normalized[idx] = 1.0
+        elif len(idx) > 1:
+            ranks = np.argsort(np.argsort(signals[idx], kind="stable"), kind="stable")
+            normalized[idx] = ranks / (len(idx) - 1)
+    return normalized
+
+
+def _velocity(terms, weights, published, n_terms):
+    """log2(share of recent mentions / share of baseline mentions) per term."""
+    dated = published != NO_TIMESTAMP
+    if not dated.any():
+        return np.zeros(n_terms)
+    newest = published[dated].max()
+    recent = dated & (published > newest - RECENT_WINDOW_SECONDS)
+    baseline = dated & ~recent & (published > newest - BASELINE_WINDOW_SECONDS)
+    if weights[baseline].sum() < MIN_BASELINE_MENTIONS:
+        return np.zeros(n_terms)
+
+    recent_counts = np.bincount(terms[recent], weights=weights[recent], minlength=n_terms)
+    baseline_counts = np.bincount(terms[baseline], weights=weights[baseline], minlength=n_terms)
+    # +1 smoothing keeps one-off mentions from swinging to ±infinity
+    recent_share = (recent_counts + 1) / (recent_counts.sum() + n_terms)
+    baseline_share = (baseline_counts + 1) / (baseline_counts.sum() + n_terms)
+    return np.log2(recent_share / baseline_share)
+
+
+def _status(velocity):
+    if velocity >= RISING_THRESHOLD:
+        return "Rising"
+    if velocity <= COOLING_THRESHOLD:
+        return "Cooling"
+    return "Stable"
+
+
+def _history_status(change):
+    if change >= HISTORY_RISING_PCT:
+        return "Rising"
+    if change <= HISTORY_COOLING_PCT:
+        return "Cooling"
+    return "Stable"
+
+
+def _record_history(history, vocab, by_platform, mentions):
+    """Append this run's per-term, per-platform counts to the history store."""
+    terms, platforms = np.nonzero(by_platform * (mentions >= HISTORY_MIN_MENTIONS)[:, None])
+    history.record_run(
+        (vocab[t], PLATFORMS[p], by_platform[t, p]) for t, p in zip(terms.tolist(), platforms.tolist())
+    )
+
+
+def _overlaps(term, mentions, row):
+    a, b = set(term.split()), set(row["term"].split())
+    if not (a <= b or b <= a):
+        return False
+    return min(mentions, row["mentions"]) >= OVERLAP_MENTION_RATIO * max(mentions, row["mentions"])
+
+
+def score_trends(entries, top_n=TOP_TERMS, min_mentions=MIN_TERM_MENTIONS, history=None):
+    """
+    Rank headline terms by a reproducible 0–100 trend score.
+
+    Combines how often a term is mentioned (duplicates collapsed by dedup
+    count via `cluster_size`), on how many platforms, whether its share of
+    mentions is growing, and the popularity signals sources report (Amazon
+    rank, Product Hunt votes, Reddit score). Returns rows sorted by score.
+
+    With a TrendHistory, this run's counts are appended to it and each row
+    gets rolling-window percent changes (`change_1h`, ...); status is then
+    based on the stored history instead of this run's timestamps alone.
+    """
+    store = entries if isinstance(entries, EntryStore) else EntryStore(entries)
+    if not len(store):
+        return []
+
+    vocab, terms, docs = _term_matrix(store)
+    if not len(terms):
+        return []
+    n_terms = len(vocab)
+
+    # Per-entry columns, straight from the store's arrays
+    cluster_sizes = np.asarray(store.cluster_sizes, dtype=np.float64)
+    published = np.asarray(store.published, dtype=np.int64)
+    platform_codes = np.array([PLATFORMS.index(platform_of(s)) for s in store.source_names], dtype=np.int64)
+    platforms = platform_codes[np.asarray(store.sources, dtype=np.int64)]
+    signal = _source_signal(np.asarray(store.signals, dtype=np.float64), platforms)
+
+    # Per-(term, entry) pairs -> (term x platform) mention matrix
+    weights = cluster_sizes[docs]
+    by_platform = np.bincount(
+        terms * len(PLATFORMS) + platforms[docs], weights=weights, minlength=n_terms * len(PLATFORMS)
+    ).reshape(n_terms, len(PLATFORMS))
+    mentions = by_platform.sum(axis=1)
+    spread = (by_platform > 0).sum(axis=1)
+
+    velocity = _velocity(terms, weights, published[docs], n_terms)
+
+    pair_signal = signal[docs]
+    has_signal = ~np.isnan(pair_signal)
+    signal_sum = np.bincount(terms[has_signal], weights=pair_signal[has_signal], minlength=n_terms)
+    signal_count = np.bincount(terms[has_signal], minlength=n_terms)
+    term_signal = np.divide(signal_sum, signal_count, out=np.zeros(n_terms), where=signal_count > 0)
+
+    components = {
+        "frequency": np.log1p(mentions) / np.log1p(mentions.max()),
+        "spread": spread / max(1, len(np.unique(platforms))),
+        "velocity": 1 / (1 + np.exp(-velocity)),
+        "signal": term_signal,
+    }
+    score = 100 * sum(SCORE_WEIGHTS[name] * values for name, values in components.items())
+    score[mentions < min_mentions] = -1
+
+    rows = []
+    for t in np.argsort(-score, kind="stable"):
+        if score[t] < 0 or len(rows) >= top_n:
+            break
+        # "vision pro" and "vision" usually describe the same trend
+        if any(_overlaps(vocab[t], mentions[t], row) for row in rows):
+            continue
+        rows.append({
+            "term": vocab[t],
+            "score": int(round(score[t])),
+            "status": _status(velocity[t]),
+            "mentions": int(mentions[t]),
+            "platforms": int(spread[t]),
+            "velocity": round(float(velocity[t]), 2),
+            "signal": round(float(term_signal[t]), 2),
+        })
+
+    if history is not None:
+        _record_history(history, vocab, by_platform, mentions)
+        changes = history.changes([row["term"] for row in rows])
+        for row in rows:
+            for window, change in changes[row["term"]].items():
+                row[f"change_{window}"] = change
+            change = row.get(f"change_{HISTORY_STATUS_WINDOW}")
+            if change is not None:
+                row["status"] = _history_status(change)
+    return rows
+
+
+def format_score_table(rows):
+    """Compact text table of score_trends() rows for the refinement prompt."""
+    if not rows:
+        return ""
+    windows = [key[len("change_"):] for key in rows[0] if key.startswith("change_")]
+    header = "term | score | status | mentions | platforms | velocity | source signal"
+    lines = [header + "".join(f" | {w} change" for w in windows)]
+    for r in rows:
+        changes = "".join(
+            " | –" if r[f"change_{w}"] is None else f" | {r[f'change_{w}']:+.0f}%" for w in windows
+        )
+        lines.append(
+            f"{r['term']} | {r['score']} | {r['status']} | {r['mentions']} | "
+            f"{r['platforms']} | {r['velocity']:+.2f} | {r['signal']:.2f}{changes}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,95 @@
+"""
+Import-time budget check for the engine's cold start.
+
+Imports TrendAgent in fresh interpreters, reports the fastest cumulative
+import time and the slowest top-level modules, and exits non-zero when the
+import exceeds the budget or pulls in a module that must only load on use
+(provider SDKs, optional parsers, pyarrow).
+
+Nothing runs this automatically: the budget only holds if the check is run
+by hand (or added as a CI step) after changing imports.
+
+    cd trendengine
+    python -m bench.bench_import
+    python -m bench.bench_import --budget-ms 400 --repeat 5
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ENTRY_MODULE = "TrendAgent"
+IMPORT_BUDGET_MS = 500
+
+# Heavy imports that must stay lazy: loaded by the code path that uses them
+LAZY_MODULES = (
+    "openai",
+    "google.generativeai",
+    "pyarrow",
+    "bs4",
+    "feedparser",
+    "lxml",
+    "sentence_transformers",
+)
+
+PROBE = (
+    "import sys; import {module}; "
+    "print('LOADED:' + ','.join(m for m in {lazy!r} if m in sys.modules))"
+)
+
+
+def measure(module=ENTRY_MODULE):
+    """(total ms, [(ms, name)] of the module's direct imports, eagerly loaded lazy modules)."""
+    env = dict(os.environ, TREND_METRICS_PATH="")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(module=module, lazy=LAZY_MODULES)],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    total, children = None, []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue   # header row
+        ms = int(cumulative) / 1000
+        if name.strip() == module and not name.startswith("  "):
+            total = ms
+        elif name.startswith("   ") and not name.startswith("    "):
+            children.append((ms, name.strip()))
+    loaded = next(line for line in proc.stdout.splitlines() if line.startswith("LOADED:"))
+    eager = [m for m in loaded[len("LOADED:"):].split(",") if m]
+    return total, sorted(children, reverse=True), eager
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--module", default=ENTRY_MODULE)
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--repeat", type=int, default=3, help="best of N fresh interpreters")
+    parser.add_argument("--top", type=int, default=8, help="slowest direct imports to list")
+    args = parser.parse_args(argv)
+
+    runs = [measure(args.module) for _ in range(args.repeat)]
+    total, children, eager = min(runs, key=lambda r: r[0])
+
+    print(f"⏱️ import {args.module}: {total:.0f} ms (best of {args.repeat}, budget {args.budget_ms:.0f} ms)")
+    for ms, name in children[:args.top]:
+        print(f"  {ms:8.1f} ms  {name}")
+
+    failures = []
+    if total > args.budget_ms:
+        failures.append(f"import took {total:.0f} ms, over the {args.budget_ms:.0f} ms budget")
+    if eager:
+        failures.append(f"imported eagerly but should load on use: {', '.join(eager)}")
+    if failures:
+        print("\n❌ Import budget check failed:")
+        for line in failures:
+            print(f"  {line}")
+        return 1
+    print("\n✅ Import within budget, heavy modules stay lazy")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
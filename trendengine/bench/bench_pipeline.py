@@ -0,0 +1,180 @@
+"""
+Offline benchmark for the trend pipeline.
+
+Generates synthetic RSS / Reddit fixtures, replays them through the HTTP
+replay transport and answers LLM calls with synthetic replies, then times
+ingestion, parsing, dedup, clustering, batching and the end-to-end run per
+corpus size.
+
+    cd trendengine
+    python -m bench.bench_pipeline --sizes 1000 10000 100000
+    python -m bench.bench_pipeline --save bench_baseline.json
+    python -m bench.bench_pipeline --baseline bench_baseline.json --tolerance 0.2
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Offline defaults must be in place before the engine modules are imported
+os.environ.setdefault("OPENAI_API_KEY", "bench-offline")
+os.environ.setdefault("TREND_METRICS_PATH", "")
+
+import TrendAgent
+from analysis import embeddings
+from analysis.batching import pack_batches
+from analysis.clustering import cluster_entries
+from analysis.dedup import dedupe_entries
+from bench.synthetic import write_corpus, FEED_HOST
+from ingestion import http_client
+from ingestion.news_rss import iter_rss_feed
+from ingestion.reddit_json import iter_subreddit, REDDIT_HOST
+from ingestion.scheduler import IngestionScheduler
+from llm import client as llm_client_module
+from llm import replay as llm_replay
+from llm.cache import llm_cache
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+STAGES = ("ingest", "parse", "dedup", "cluster", "batching", "end_to_end")
+# Ignore slowdowns smaller than this; sub-50ms stages are mostly timer noise
+MIN_REGRESSION_SECONDS = 0.05
+
+
+def _scheduler(feed_urls, subreddits):
+    scheduler = IngestionScheduler(
+        max_workers=TrendAgent.INGEST_MAX_WORKERS,
+        per_host_limit=TrendAgent.INGEST_PER_HOST_LIMIT,
+        host_limits=TrendAgent.INGEST_HOST_LIMITS,
+    )
+    for url in feed_urls:
+        scheduler.add(FEED_HOST, iter_rss_feed, url)
+    for sub in subreddits:
+        scheduler.add(REDDIT_HOST, iter_subreddit, sub, limit=100, stop_at_watermark=False)
+    return scheduler
+
+
+def _timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def bench_size(n_items, fixture_dir, http_latency_ms, llm_latency_ms, error_rate):
+    feed_urls, subreddits = write_corpus(fixture_dir, n_items)
+    results = {}
+
+    # Fetch + parse through the replay transport with simulated network latency
+    http_client.configure(mode="replay", fixture_dir=fixture_dir,
+                          latency_ms=http_latency_ms, error_rate=error_rate)
+    entries, results["ingest"] = _timed(lambda: _scheduler(feed_urls, subreddits).run())
+
+    # Same path with zero latency: transport-free parsing cost
+    http_client.configure(latency_ms=0, error_rate=0)
+    entries, results["parse"] = _timed(lambda: _scheduler(feed_urls, subreddits).run())
+
+    unique, results["dedup"] = _timed(lambda: dedupe_entries(entries))
+    _, results["cluster"] = _timed(lambda: cluster_entries(unique))
+
+    budget = TrendAgent.BATCH_TOKEN_BUDGET
+    batches, results["batching"] = _timed(lambda: [
+        TrendAgent.build_batch_prompt([TrendAgent.format_headline(e) for e in batch])
+        for batch in pack_batches(unique, budget, label=TrendAgent.format_headline)
+    ])
+
+    http_client.configure(latency_ms=http_latency_ms, error_rate=error_rate)
+    llm_replay.configure(mode="replay", latency_ms=llm_latency_ms, error_rate=error_rate)
+
+    def end_to_end():
+        collected = _scheduler(feed_urls, subreddits).run()
+        return TrendAgent.analyze_batched(dedupe_entries(collected))
+
+    _, results["end_to_end"] = _timed(end_to_end)
+
+    return {
+        "items": len(entries),
+        "unique": len(unique),
+        "batches": len(batches),
+        "seconds": {k: round(v, 4) for k, v in results.items()},
+        "items_per_sec": {k: round(len(entries) / v) if v else None for k, v in results.items()},
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of regressions (stage slower than baseline by more than `tolerance`)."""
+    regressions = []
+    for size, result in results.items():
+        base = baseline.get(size)
+        if not base:
+            continue
+        for stage, seconds in result["seconds"].items():
+            ref = base["seconds"].get(stage)
+            if ref and seconds > ref * (1 + tolerance) and seconds - ref > MIN_REGRESSION_SECONDS:
+                regressions.append(f"{size} items / {stage}: {seconds:.3f}s vs {ref:.3f}s baseline")
+    return regressions
+
+
+def print_table(results):
+    print(f"\n{'items':>8}{'unique':>8}{'batches':>9}" + "".join(f"{s:>12}" for s in STAGES))
+    for size, r in results.items():
+        print(f"{r['items']:>8}{r['unique']:>8}{r['batches']:>9}"
+              + "".join(f"{r['seconds'][s]:>11.3f}s" for s in STAGES))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--http-latency-ms", type=float, default=50)
+    parser.add_argument("--llm-latency-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--save", help="write results JSON here")
+    parser.add_argument("--baseline", help="compare against a saved results JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--verbose", action="store_true", help="show pipeline output")
+    args = parser.parse_args(argv)
+
+    # Benchmarks measure our code, not vendor quotas or warm caches
+    TrendAgent.mini_rate_limiter.rpm = None
+    TrendAgent.mini_rate_limiter.tpm = None
+    llm_client_module.RETRY_BASE_DELAY = 0
+    llm_cache.bypass = True
+    embeddings.EMBEDDING_BACKEND = "hashing"   # no model download, comparable across machines
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="trend-bench-") as tmp:
+        llm_cache.path = os.path.join(tmp, "llm_cache.sqlite3")
+        if TrendAgent.trend_history is not None:
+            TrendAgent.trend_history.path = os.path.join(tmp, "trend_history.sqlite3")
+        http_client.HTTP_CACHE_DIR = os.path.join(tmp, "http-cache")
+        for size in args.sizes:
+            fixture_dir = os.path.join(tmp, f"fixtures-{size}")
+            quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+            with quiet:
+                results[str(size)] = bench_size(size, fixture_dir, args.http_latency_ms,
+                                                args.llm_latency_ms, args.error_rate)
+            print(f"✅ {size} items done")
+
+    print_table(results)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved results to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\n❌ Regressions:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\n✅ No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+import json
+import random
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from xml.sax.saxutils import escape
+
+from ingestion.http_client import write_fixture
+from ingestion.reddit_json import REDDIT_HOST
+
+# ------------------------------
+# SYNTHETIC CORPUS
+# ------------------------------
+
+VOCAB = (
+    "AI robot vacuum earbuds smartwatch laptop GPU chip foldable phone OLED TV "
+    "smart home hub Matter thermostat drone e-bike camera console VR headset "
+    "battery charger router WiFi7 mesh speaker soundbar tablet stylus keyboard "
+    "launch review leak price cut deal sales surge shortage recall update beta "
+    "Apple Samsung Google Sony Xiaomi Dyson Nvidia AMD Intel Meta Amazon Lenovo "
+    "record cheaper faster thinner brighter smarter Europe Germany holiday Q4"
+).split()
+
+ITEMS_PER_DOCUMENT = 100
+FEED_HOST = "bench.local"
+NEAR_DUPLICATE_SHARE = 0.15
+
+
+def synthetic_titles(n, seed=0):
+    """Random headlines; a share are light rewrites of earlier ones to exercise dedup."""
+    rng = random.Random(seed)
+    titles = []
+    for _ in range(n):
+        if titles and rng.random() < NEAR_DUPLICATE_SHARE:
+            words = rng.choice(titles).split()
+            words[rng.randrange(len(words))] = rng.choice(VOCAB)
+            titles.append(" ".join(words))
+        else:
+            titles.append(" ".join(rng.choice(VOCAB) for _ in range(rng.randint(6, 12))))
+    return titles
+
+
+def _rss_document(titles, feed_no, now):
+    items = []
+    for i, title in enumerate(titles):
+        published = format_datetime(now - timedelta(minutes=i))
+        items.append(
+            f"<item><title>{escape(title)}</title>"
+            f"<link>https://{FEED_HOST}/story/{feed_no}/{i}</link>"
+            f"<description>{escape(title)} — details inside.</description>"
+            f"<pubDate>{published}</pubDate></item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+        f"<title>Bench feed {feed_no}</title>{''.join(items)}</channel></rss>"
+    ).encode("utf-8")
+
+
+def _reddit_document(titles, sub, now):
+    children = [
+        {"data": {
+            "title": title,
+            "selftext": f"{title}. Discussion thread.",
+            "permalink": f"/r/{sub}/comments/{i}/",
+            "created_utc": (now - timedelta(minutes=i)).timestamp(),
+            "score": 100 + i,
+        }}
+        for i, title in enumerate(titles)
+    ]
+    return json.dumps({"data": {"children": children, "after": None}}).encode("utf-8")
+
+
+def write_corpus(fixture_dir, n_items, seed=0):
+    """
+    Write HTTP fixtures for `n_items` entries, half RSS feeds and half
+    Reddit listings of ITEMS_PER_DOCUMENT each.
+
+    Returns (feed_urls, subreddits) to schedule against the replay transport.
+    """
+    now = datetime.now(timezone.utc)
+    titles = synthetic_titles(n_items, seed)
+    chunks = [titles[i:i + ITEMS_PER_DOCUMENT] for i in range(0, n_items, ITEMS_PER_DOCUMENT)]
+
+    feed_urls, subreddits = [], []
+    for n, chunk in enumerate(chunks):
+        if n % 2 == 0:
+            url = f"https://{FEED_HOST}/feed/{n}.xml"
+            write_fixture(fixture_dir, "GET", url, 200, {"Content-Type": "application/rss+xml"},
+                          _rss_document(chunk, n, now))
+            feed_urls.append(url)
+        else:
+            sub = f"bench{n}"
+            url = f"https://{REDDIT_HOST}/r/{sub}/hot.json?limit={ITEMS_PER_DOCUMENT}"
+            write_fixture(fixture_dir, "GET", url, 200, {"Content-Type": "application/json"},
+                          _reddit_document(chunk, sub, now))
+            subreddits.append(sub)
+    return feed_urls, subreddits
@@ -0,0 +1,187 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from config import env
+from ingestion.entry_store import EntryStore, has_arrow
+
+# ------------------------------
+# CHECKPOINT CONFIG
+# ------------------------------
+
+CHECKPOINT_DIR = env("TREND_CHECKPOINT_DIR", ".checkpoints")
+
+# Runs untouched for this long (finished or not) are removed when a new run starts
+CHECKPOINT_RETENTION_SECONDS = 7 * 24 * 3600
+
+
+def new_run_id():
+    """Sortable id, unique to the microsecond (the directory is also created exclusively)."""
+    return datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+
+
+def latest_run_id(root=CHECKPOINT_DIR):
+    """Run id of the most recently started checkpoint, or None."""
+    if not os.path.isdir(root):
+        return None
+    runs = [d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d))]
+    return max(runs, default=None)
+
+
+def run_exists(run_id, root=CHECKPOINT_DIR):
+    return os.path.isdir(os.path.join(root, run_id))
+
+
+def _write_atomic(path, text):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class RunCheckpoint:
+    """
+    Durable per-run state under .checkpoints/<run_id>/, so an interrupted
+    run can be resumed without redoing fetches or paid LLM calls.
+
+      entries.parquet / .jsonl   collected entries (before dedup; one file
+                                 per source group in multi-market runs)
+      score_table.txt            local trend scores (history is recorded once)
+      summaries.jsonl            one line per completed batch / reduce call,
+                                 keyed by sha1 of its prompt
+      refine_prompt.txt          the final refinement prompt
+      report.txt                 the finished report
+
+    Summaries are appended and fsynced as each batch completes, so a crash
+    in batch 37 of 50 loses at most the batches still in flight. Prompts
+    are rebuilt deterministically from the checkpointed entries on resume.
+    """
+
+    def __init__(self, run_id=None, root=CHECKPOINT_DIR):
+        self._lock = threading.Lock()
+        self._summaries = None
+        if run_id is not None:
+            # Resuming: a mistyped or pruned id must not start a fresh paid run
+            if not run_exists(run_id, root):
+                raise FileNotFoundError(f"no checkpointed run {run_id!r} in {root}")
+            self.run_id = run_id
+            self.path = os.path.join(root, run_id)
+            return
+
+        # A new run never shares a directory with another one started concurrently
+        os.makedirs(root, exist_ok=True)
+        while True:
+            self.run_id = new_run_id()
+            self.path = os.path.join(root, self.run_id)
+            try:
+                os.mkdir(self.path)
+                return
+            except FileExistsError:
+                continue
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    # ------------------------------
+    # ENTRIES
+    # ------------------------------
+
+    def save_entries(self, store, name="entries"):
+        if has_arrow():
+            tmp = self._file(f"{name}.parquet.tmp")
+            store.write_parquet(tmp)
+            os.replace(tmp, self._file(f"{name}.parquet"))
+        else:
+            _write_atomic(
+                self._file(f"{name}.jsonl"),
+                "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in store.to_dicts()),
+            )
+
+    def load_entries(self, name="entries"):
+        """The checkpointed EntryStore, or None if ingestion never finished."""
+        if os.path.exists(self._file(f"{name}.parquet")):
+            return EntryStore.read_parquet(self._file(f"{name}.parquet"))
+        if os.path.exists(self._file(f"{name}.jsonl")):
+            with open(self._file(f"{name}.jsonl"), encoding="utf-8") as f:
+                return EntryStore(json.loads(line) for line in f)
+        return None
+
+    # ------------------------------
+    # BATCH SUMMARIES
+    # ------------------------------
+
+    @staticmethod
+    def prompt_key(prompt):
+        return hashlib.sha1(prompt.encode("utf-8")).hexdigest()
+
+    def _load_summaries(self):
+        summaries = {}
+        path = self._file("summaries.jsonl")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:   # torn last line from a crash
+                        continue
+                    summaries[record["key"]] = record["summary"]
+        return summaries
+
+    def get_summary(self, prompt):
+        with self._lock:
+            if self._summaries is None:
+                self._summaries = self._load_summaries()
+            return self._summaries.get(self.prompt_key(prompt))
+
+    def add_summary(self, prompt, summary):
+        key = self.prompt_key(prompt)
+        with self._lock:
+            if self._summaries is None:
+                self._summaries = self._load_summaries()
+            self._summaries[key] = summary
+            with open(self._file("summaries.jsonl"), "a", encoding="utf-8") as f:
+                f.write(json.dumps({"key": key, "summary": summary}, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    # ------------------------------
+    # TEXT STAGES
+    # ------------------------------
+
+    def save_text(self, name, text):
+        _write_atomic(self._file(name + ".txt"), text)
+
+    def load_text(self, name):
+        path = self._file(name + ".txt")
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+
+
+def prune_checkpoints(root=CHECKPOINT_DIR, retention=CHECKPOINT_RETENTION_SECONDS, keep=None):
+    """
+    Delete runs whose files were last written more than `retention` ago.
+
+    Finished, failed and abandoned runs alike: whether a run finished is
+    not decidable from its files alone (a multi-market run has one report
+    per market), and a run untouched for that long is not worth resuming.
+    """
+    if not os.path.isdir(root):
+        return
+    cutoff = time.time() - retention
+    for run_id in os.listdir(root):
+        path = os.path.join(root, run_id)
+        if run_id == keep or not os.path.isdir(path):
+            continue
+        files = [os.path.join(path, n) for n in os.listdir(path)]
+        if max(map(os.path.getmtime, files), default=os.path.getmtime(path)) > cutoff:
+            continue
+        for name in os.listdir(path):
+            os.remove(os.path.join(path, name))
+        os.rmdir(path)
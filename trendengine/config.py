@@ -0,0 +1,22 @@
+import os
+
+from dotenv import load_dotenv
+
+# ------------------------------
+# ENVIRONMENT
+# ------------------------------
+
+# .env is read once, here; every module reads its settings through `env`
+# (or the keys below), so importing this first is all it takes
+load_dotenv()
+
+
+def env(name, default=None):
+    return os.getenv(name, default)
+
+
+OPENAI_API_KEY = env("OPENAI_API_KEY")
+GEMINI_API_KEY = env("GEMINI_API_KEY")
+NEWSAPI_KEY = env("NEWSAPI_KEY")
+YOUTUBE_API_KEY = env("YOUTUBE_API_KEY")
+PRODUCT_HUNT_API_KEY = env("PRODUCT_HUNT_API_KEY")
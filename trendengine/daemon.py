@@ -0,0 +1,290 @@
+"""
+Trend engine as a long-running service.
+
+Keeps everything a one-shot run rebuilds warm in memory: the pooled HTTP
+session and its conditional-GET cache, the LLM clients and their event
+loop, the seen index, the parsed source registry and the latest entries
+of every source. Each tick fetches only the sources whose refresh
+interval has passed (see sources.json) and regenerates the report when
+the collected items changed; already analyzed items reuse their batch
+summaries, so a refresh costs the new batches plus one refinement.
+
+    cd trendengine
+    python daemon.py
+    python daemon.py --markets DE,NL --port 8800 --report-every 15
+
+    curl localhost:8765/report              # latest report (?market=DE)
+    curl localhost:8765/status              # sources, item counts, report age
+    curl -X POST localhost:8765/refresh     # refresh due sources + report now
+    curl -X POST "localhost:8765/refresh?force=1"   # refetch every source
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import TrendAgent as engine
+from config import env
+from ingestion.entry_store import EntryStore
+from ingestion.markets import MARKETS, parse_markets
+from ingestion.registry import QuotaLedger
+from ingestion.seen_index import SeenIndex
+from instrumentation import recorder, span
+from report_stream import ReportStream, REPORT_PATH
+
+# ------------------------------
+# DAEMON CONFIG
+# ------------------------------
+
+DAEMON_HOST = env("TREND_DAEMON_HOST", "127.0.0.1")
+DAEMON_PORT = int(env("TREND_DAEMON_PORT", "8765"))
+
+# How often due sources are checked, and the minimum time between
+# scheduled reports (on-demand refreshes are not held back by it)
+TICK_SECONDS = 60
+REPORT_EVERY_MINUTES = 30
+
+
+class TrendDaemon:
+    """
+    Refresh loop plus the warm state shared with the HTTP handler.
+
+    `window` holds the latest fetch of every source, keyed by (source,
+    markets group); a refresh replaces only the sources it fetched, and
+    keeps the previous items when a fetch comes back empty (outage,
+    exhausted quota) rather than dropping the source from the report.
+    """
+
+    def __init__(self, markets=None, report_every_minutes=REPORT_EVERY_MINUTES, tick_seconds=TICK_SECONDS):
+        self.markets = markets or []
+        self.report_every = report_every_minutes * 60
+        self.tick = tick_seconds
+        self.seen_index = SeenIndex() if engine.INCREMENTAL else None
+        # Refresh intervals are tracked in the ledger, so it is needed even
+        # when quota pacing is switched off for one-shot runs
+        if engine.quota_ledger is None:
+            engine.quota_ledger = QuotaLedger()
+
+        self.window = {}
+        self.reports = {}
+        self.report_at = None
+        self._checked_at = None   # last report attempt, changed or not
+        self.last_error = None
+        self._fingerprint = None
+        self._source_order = {source.name: i for i, source in enumerate(engine.SOURCES)}
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._requested = False
+        self._force = True   # first cycle: the window is empty, fetch everything
+
+    # ------------------------------
+    # REFRESH
+    # ------------------------------
+
+    def refresh(self, force=False):
+        """Fetch due sources (all with `force`) into the window; returns the number of calls."""
+        scheduler = engine.build_scheduler(self.markets or None, only_due=not force, tag_source=True)
+        if not scheduler.tasks:
+            return 0
+        calls = len(scheduler.tasks)
+
+        with span("ingest", "stage") as s:
+            groups = scheduler.run_groups()
+            items = sum(map(len, groups.values()))
+            s.add(items=items)
+        sources = len(set(name for name, _ in groups))
+        print(f"⏱️ Refreshed {sources} sources ({items} items, {calls} calls) in {s.wall_ms / 1000:.1f}s")
+
+        with self._lock:
+            for key, entries in groups.items():
+                if len(entries) or key not in self.window:
+                    self.window[key] = entries
+        return calls
+
+    def _ordered_window(self):
+        """Window snapshots in registry order, so prompts do not depend on refresh order."""
+        with self._lock:
+            items = list(self.window.items())
+        return sorted(items, key=lambda kv: (self._source_order.get(kv[0][0], len(self._source_order)), str(kv[0][1])))
+
+    def fingerprint(self):
+        digest = hashlib.sha1()
+        for (name, group), entries in self._ordered_window():
+            digest.update(f"{name}|{group}\n".encode("utf-8"))
+            for entry in entries:
+                digest.update(f"{entry['title']}|{entry['url']}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+    # ------------------------------
+    # REPORT
+    # ------------------------------
+
+    def regenerate(self):
+        """Analyze the window into fresh report(s), unless nothing changed since the last one."""
+        self._checked_at = time.time()
+        fingerprint = self.fingerprint()
+        if fingerprint == self._fingerprint:
+            print("💤 No new items since the last report")
+            return False
+
+        recorder.start_run()
+        with span("run", "run"):
+            if self.markets:
+                groups = {}
+                for (_, group), entries in self._ordered_window():
+                    groups.setdefault(group, EntryStore()).extend(entries)
+                reports = engine.analyze_markets(groups, self.markets, seen_index=self.seen_index)
+            else:
+                all_entries = EntryStore()
+                for _, entries in self._ordered_window():
+                    all_entries.extend(entries)
+                print(f"\n📦 Items in window: {len(all_entries)}")
+                stream = ReportStream(REPORT_PATH, echo=False) if engine.STREAM_REPORT else None
+                report = engine.analyze_collected(all_entries, self.seen_index, stream)
+                engine.write_report(report, stream)
+                reports = {None: report}
+        recorder.print_summary()
+        engine.print_cache_stats()
+
+        with self._lock:
+            self.reports = reports
+            self.report_at = time.time()
+            self._fingerprint = fingerprint
+        return True
+
+    # ------------------------------
+    # LOOP
+    # ------------------------------
+
+    def request_refresh(self, force=False):
+        """Refresh and report on the next loop iteration (called from HTTP threads)."""
+        with self._lock:
+            self._requested = True
+            self._force = self._force or force
+        self._wake.set()
+
+    def cycle(self):
+        with self._lock:
+            requested, force = self._requested, self._force
+            self._requested = self._force = False
+
+        self.refresh(force=force)
+        report_due = self._checked_at is None or time.time() - self._checked_at >= self.report_every
+        if requested or report_due:
+            self.regenerate()
+
+    def run(self):
+        print(f"🔁 Daemon loop: tick {self.tick}s, report every {self.report_every / 60:g} min")
+        while not self._stop.is_set():
+            try:
+                self.cycle()
+                self.last_error = None
+            except Exception as e:   # one bad cycle must not take the service down
+                self.last_error = repr(e)
+                print(f"⚠️ Refresh cycle failed: {e}")
+            self._wake.wait(self.tick)
+            self._wake.clear()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def status(self):
+        ledger = engine.quota_ledger
+        sources = {}
+        for (name, group), entries in self._ordered_window():
+            info = sources.setdefault(name, {"items": 0, "fetched_at": ledger.last_fetch(name)})
+            info["items"] += len(entries)
+        return {
+            "markets": self.markets,
+            "report_at": self.report_at,
+            "report_age_seconds": None if self.report_at is None else round(time.time() - self.report_at),
+            "sources": sources,
+            "last_error": self.last_error,
+        }
+
+
+# ------------------------------
+# HTTP ENDPOINT
+# ------------------------------
+
+def make_handler(daemon):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, body, content_type="application/json"):
+            data = body.encode("utf-8") if isinstance(body, str) else json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            query = parse_qs(url.query)
+            if url.path == "/report":
+                market = query.get("market", [None])[0]
+                market = market.upper() if market else (daemon.markets[0] if len(daemon.markets) == 1 else None)
+                with daemon._lock:
+                    report = daemon.reports.get(market)
+                if report is None:
+                    if daemon.markets and market not in daemon.markets:
+                        return self._send(404, {"error": f"pass ?market= one of {','.join(daemon.markets)}"})
+                    return self._send(503, {"error": "no report yet"})
+                return self._send(200, report, "text/plain")
+            if url.path == "/status":
+                return self._send(200, daemon.status())
+            self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            url = urlsplit(self.path)
+            if url.path != "/refresh":
+                return self._send(404, {"error": "not found"})
+            force = parse_qs(url.query).get("force", ["0"])[0] not in ("0", "", "false")
+            daemon.request_refresh(force=force)
+            self._send(202, {"queued": True, "force": force})
+
+        def log_message(self, format, *args):
+            pass   # the loop already logs every refresh
+
+    return Handler
+
+
+def serve(daemon, host=DAEMON_HOST, port=DAEMON_PORT):
+    """Run the HTTP endpoint in the background and the refresh loop in this thread."""
+    server = ThreadingHTTPServer((host, port), make_handler(daemon))
+    threading.Thread(target=server.serve_forever, name="trend-daemon-http", daemon=True).start()
+    print(f"🛰️ Trend daemon on http://{host}:{port} (GET /report, GET /status, POST /refresh)")
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        print("\n👋 Stopping trend daemon")
+    finally:
+        daemon.stop()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve continuously refreshed trend reports.")
+    parser.add_argument("--host", default=DAEMON_HOST)
+    parser.add_argument("--port", type=int, default=DAEMON_PORT)
+    parser.add_argument(
+        "--markets", metavar="CODES",
+        help=f"comma-separated markets, one report each (known: {','.join(MARKETS)})",
+    )
+    parser.add_argument("--report-every", type=float, default=REPORT_EVERY_MINUTES, metavar="MINUTES",
+                        help="minimum minutes between scheduled reports")
+    parser.add_argument("--tick", type=float, default=TICK_SECONDS, metavar="SECONDS",
+                        help="how often due sources are checked")
+    args = parser.parse_args()
+
+    try:
+        markets = parse_markets(args.markets) if args.markets else engine.TARGET_MARKETS
+    except ValueError as e:
+        parser.error(str(e))
+
+    serve(TrendDaemon(markets, args.report_every, args.tick), args.host, args.port)
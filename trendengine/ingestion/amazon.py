@@ -1,5 +1,22 @@
-import requests
-from bs4 import BeautifulSoup
+import re
+from urllib.parse import urlsplit
+
+from config import env
+from ingestion import http_client
+
+# Parser backends, fastest first; bs4 is the always-available fallback
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser as SelectolaxParser   # selectolax < 1.0
+    except ImportError:
+        SelectolaxParser = None
+
+try:
+    from lxml import etree, html as lxml_html
+except ImportError:
+    lxml_html = None
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -8,46 +25,220 @@ HEADERS = {
     "Accept-Language": "en-US,en;q=0.9",
 }
 
-AMAZON_BEST_SELLERS_URL = "https://www.amazon.com/Best-Sellers-Electronics/zgbs/electronics"
+AMAZON_HOST = "www.amazon.com"
+AMAZON_BEST_SELLERS_URL = f"https://{AMAZON_HOST}/Best-Sellers-Electronics/zgbs/electronics"
 
-def fetch_amazon_best_sellers():
-    print("🔍 Fetching Amazon Best Sellers")
+# Electronics best-seller categories scraped per run (each has AMAZON_PAGES pages)
+AMAZON_CATEGORY_URLS = [
+    AMAZON_BEST_SELLERS_URL,
+    f"https://{AMAZON_HOST}/Best-Sellers-Electronics-Headphones-Earbuds-Accessories/zgbs/electronics/172541",
+    f"https://{AMAZON_HOST}/Best-Sellers-Electronics-Smart-Home/zgbs/electronics/6563140011",
+    f"https://{AMAZON_HOST}/Best-Sellers-Electronics-Computers-Accessories/zgbs/electronics/541966",
+    f"https://{AMAZON_HOST}/Best-Sellers-Electronics-Cell-Phones-Accessories/zgbs/electronics/2335752011",
+    f"https://{AMAZON_HOST}/Best-Sellers-Electronics-Wearable-Technology/zgbs/electronics/10048700011",
+    f"https://{AMAZON_HOST}/Best-Sellers-Electronics-Television-Video/zgbs/electronics/1266092011",
+    f"https://{AMAZON_HOST}/Best-Sellers-Electronics-Camera-Photo/zgbs/electronics/502394",
+]
+AMAZON_PAGES = 2   # best-seller lists are 2 pages of 50
 
-    try:
-        response = requests.get(AMAZON_BEST_SELLERS_URL, headers=HEADERS, timeout=10)
-        soup = BeautifulSoup(response.text, "html.parser")
-    except Exception as e:
-        print(f"Error fetching Amazon: {e}")
-        return []
+# "auto" picks selectolax, then lxml, then BeautifulSoup
+AMAZON_PARSER = env("AMAZON_PARSER", "auto")
+
+BLOCK_CLASS = "zg-grid-general-faceout"
+BLOCK_SELECTOR = f".{BLOCK_CLASS}"
+TITLE_SELECTOR = ".p13n-sc-truncate-desktop-type2"
+LINK_SELECTOR = "a.a-link-normal"
+RANK_SELECTOR = ".zg-bdg-text"
+
+
+def _has_class(name):
+    return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
+
+
+# Compiled once at import; XPath avoids a cssselect dependency for lxml
+if lxml_html is not None:
+    _XP_BLOCKS = etree.XPath(f"//div[{_has_class(BLOCK_CLASS)}]")
+    _XP_TITLE = etree.XPath(f".//*[{_has_class('p13n-sc-truncate-desktop-type2')}]")
+    _XP_IMG = etree.XPath(".//img")
+    _XP_LINK = etree.XPath(f".//a[{_has_class('a-link-normal')}]")
+    _XP_RANK = etree.XPath(f".//*[{_has_class('zg-bdg-text')}]")
+
+
+# ------------------------------
+# PARSER BACKENDS
+# ------------------------------
+# Each yields (title, href, rank) per product block, and only builds a tree
+# for the product blocks: bs4 through a SoupStrainer, the others from the
+# slice of the page that holds them (the head, scripts, navigation and
+# footer are most of a best-seller page).
+
+_DIV_TAG = re.compile(r"<div\b|</div>")
+
+
+def _product_region(page):
+    """HTML from the first product block to the end of the last (the whole page if not found)."""
+    first = page.find(BLOCK_CLASS)
+    last = page.rfind(BLOCK_CLASS)
+    start = page.rfind("<div", 0, first) if first >= 0 else -1
+    last_start = page.rfind("<div", 0, last) if last >= 0 else -1
+    if start < 0 or last_start < 0:
+        return page
+
+    depth = 0
+    for tag in _DIV_TAG.finditer(page, last_start):
+        depth += -1 if tag.group() == "</div>" else 1
+        if depth == 0:
+            return page[start:tag.end()]
+    return page[start:]
+
+
+def _parse_selectolax(page):
+    tree = SelectolaxParser(_product_region(page))
+    for block in tree.css(BLOCK_SELECTOR):
+        title_tag = block.css_first(TITLE_SELECTOR) or block.css_first("img")
+        title = None
+        if title_tag is not None:
+            title = title_tag.attributes.get("alt") or title_tag.text(strip=True)
+
+        link_tag = block.css_first(LINK_SELECTOR)
+        rank_tag = block.css_first(RANK_SELECTOR)
+        yield (
+            title,
+            link_tag.attributes.get("href") if link_tag is not None else None,
+            rank_tag.text(strip=True) if rank_tag is not None else None,
+        )
+
+
+def _first(xpath, node):
+    found = xpath(node)
+    return found[0] if found else None
+
+
+def _parse_lxml(page):
+    tree = lxml_html.fromstring(_product_region(page))
+    for block in _XP_BLOCKS(tree):
+        title_tag = _first(_XP_TITLE, block)
+        if title_tag is None:
+            title_tag = _first(_XP_IMG, block)
+        title = None
+        if title_tag is not None:
+            title = title_tag.get("alt") or title_tag.text_content().strip()
+
+        link_tag = _first(_XP_LINK, block)
+        rank_tag = _first(_XP_RANK, block)
+        yield (
+            title,
+            link_tag.get("href") if link_tag is not None else None,
+            rank_tag.text_content().strip() if rank_tag is not None else None,
+        )
 
-    items = []
-    product_blocks = soup.select(".zg-grid-general-faceout")
 
-    for block in product_blocks:
-        # Title
-        title_tag = block.select_one(".p13n-sc-truncate-desktop-type2") or block.select_one("img")
+def _is_block(css_class):
+    # The strainer sees the raw attribute string while parsing, not the split list
+    return bool(css_class) and BLOCK_CLASS in css_class.split()
+
+
+def _parse_bs4(page):
+    from bs4 import BeautifulSoup, SoupStrainer   # fallback parser; slow import, load on use
+
+    # Only build the tree for product blocks, not the whole page
+    only_blocks = SoupStrainer(class_=_is_block)
+    soup = BeautifulSoup(page, "html.parser", parse_only=only_blocks)
+    for block in soup.select(BLOCK_SELECTOR):
+        title_tag = block.select_one(TITLE_SELECTOR) or block.select_one("img")
         title = None
         if title_tag:
             title = title_tag.get("alt") or title_tag.text.strip()
 
+        link_tag = block.select_one(LINK_SELECTOR)
+        rank_tag = block.select_one(RANK_SELECTOR)
+        yield (
+            title,
+            link_tag["href"] if link_tag else None,
+            rank_tag.text.strip() if rank_tag else None,
+        )
+
+
+PARSERS = {
+    "selectolax": _parse_selectolax if SelectolaxParser is not None else None,
+    "lxml": _parse_lxml if lxml_html is not None else None,
+    "bs4": _parse_bs4,
+}
+
+
+def get_parser(name=None):
+    name = name or AMAZON_PARSER
+    if name == "auto":
+        return next(p for p in PARSERS.values() if p is not None)
+    parser = PARSERS.get(name)
+    if parser is None:
+        raise ValueError(f"Amazon parser '{name}' is not available")
+    return parser
+
+
+def _rank_signal(rank):
+    """Best-seller badge ("#12") as a higher-is-better signal (1/rank)."""
+    try:
+        return 1.0 / int(rank.lstrip("#").replace(",", ""))
+    except (AttributeError, ValueError, ZeroDivisionError):
+        return None
+
+
+def parse_best_sellers(page, parser=None, base_url=f"https://{AMAZON_HOST}"):
+    """Yield pipeline entries from a best-seller page's HTML (only the product blocks are parsed)."""
+    for title, href, rank in get_parser(parser)(page):
         if not title:
             continue
 
-        # Link
-        link_tag = block.select_one("a.a-link-normal")
-        link = "https://www.amazon.com" + link_tag["href"] if link_tag else None
-
-        # Best sellers rank
-        rank_tag = block.select_one(".zg-bdg-text")
-        rank = rank_tag.text.strip() if rank_tag else None
+        link = base_url + href if href else None
 
-        items.append({
+        yield {
             "source": "amazon",
             "title": title,
             "text": f"{title} (Amazon Best Seller Rank: {rank})",
             "url": link,
             "published_at": None,
-        })
+            "signal": _rank_signal(rank),
+        }
+
+
+# ------------------------------
+# FETCHING
+# ------------------------------
+
+def amazon_page_urls(category_urls=None, pages=AMAZON_PAGES):
+    """Every (category, page) best-seller URL to fetch; schedule them concurrently."""
+    urls = []
+    for url in category_urls or AMAZON_CATEGORY_URLS:
+        for pg in range(1, pages + 1):
+            urls.append(url if pg == 1 else f"{url}?pg={pg}")
+    return urls
+
+
+def amazon_market_urls(host, pages=AMAZON_PAGES):
+    """Electronics best-seller pages of a regional storefront (e.g. www.amazon.de)."""
+    return amazon_page_urls([f"https://{host}/gp/bestsellers/electronics"], pages)
+
+
+def iter_amazon_best_sellers(url=AMAZON_BEST_SELLERS_URL):
+    """Yield best-seller products as each product block is parsed."""
+    print(f"🔍 Fetching Amazon Best Sellers: {url}")
+
+    try:
+        response = http_client.get(url, headers=HEADERS, conditional=True)
+        page = response.content
+    except Exception as e:
+        print(f"Error fetching Amazon: {e}")
+        return
+
+    count = 0
+    parts = urlsplit(url)
+    for item in parse_best_sellers(page, base_url=f"{parts.scheme}://{parts.netloc}"):
+        count += 1
+        yield item
+
+    print(f"Amazon products scraped: {count}")
+
 
-    print(f"Amazon products scraped: {len(items)}")
-    return items
+def fetch_amazon_best_sellers(url=AMAZON_BEST_SELLERS_URL):
+    return list(iter_amazon_best_sellers(url))
@@ -0,0 +1,323 @@
+import importlib.util
+import math
+import sys
+from array import array
+from datetime import datetime, timezone
+
+from ingestion.seen_index import parse_published
+
+# pyarrow is optional (Arrow / Parquet export only) and slow to import
+
+
+def has_arrow():
+    """True when pyarrow is installed (without importing it)."""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _arrow():
+    """(pyarrow, pyarrow.parquet), imported on first use: optional and slow to import."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("pyarrow is required for Arrow / Parquet export (pip install pyarrow)")
+    return pa, pq
+
+
+# ------------------------------
+# ENTRY STORE
+# ------------------------------
+
+FIELDS = ("source", "title", "text", "url", "published_at", "cluster_size", "signal")
+
+# published_at column value for entries without a (parseable) timestamp
+NO_TIMESTAMP = -(2 ** 63)
+
+# Fields read straight from a column (source / published_at / signal need decoding)
+_PLAIN_COLUMNS = {"title": "titles", "text": "texts", "url": "urls", "cluster_size": "cluster_sizes"}
+
+
+def to_epoch(value):
+    """Seconds since the epoch for an ISO / RFC-822 string or number (NO_TIMESTAMP if unknown)."""
+    if value is None:
+        return NO_TIMESTAMP
+    if isinstance(value, (int, float)):
+        return int(value)
+    dt = parse_published(value)
+    return int(dt.timestamp()) if dt is not None else NO_TIMESTAMP
+
+
+def _to_signal(value):
+    return math.nan if value is None else float(value)
+
+
+def from_epoch(ts):
+    """ISO-8601 UTC string for an epoch column value (None for NO_TIMESTAMP)."""
+    if ts == NO_TIMESTAMP:
+        return None
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+
+
+class Entry:
+    """
+    Row view into an EntryStore.
+
+    Reads like the entry dicts the fetchers yield (`entry["title"]`,
+    `entry.get("url")`, `dict(entry)`), but holds no data of its own.
+    `published_at` comes back as an ISO UTC string; `published_ts` is
+    the raw epoch value.
+    """
+
+    __slots__ = ("store", "index")
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    def __getitem__(self, key):
+        return self.store.value(self.index, key)
+
+    def __setitem__(self, key, value):
+        self.store.set_value(self.index, key, value)
+
+    def __contains__(self, key):
+        return key in self.keys()
+
+    def get(self, key, default=None):
+        try:
+            return self.store.value(self.index, key)
+        except KeyError:
+            return default
+
+    def keys(self):
+        extra = self.store._extras.get(self.index)
+        return FIELDS + tuple(extra) if extra else FIELDS
+
+    def to_dict(self):
+        return {key: self[key] for key in self.keys()}
+
+    @property
+    def published_ts(self):
+        ts = self.store.published[self.index]
+        return None if ts == NO_TIMESTAMP else ts
+
+    def __repr__(self):
+        return f"Entry({self.to_dict()!r})"
+
+
+class EntryView:
+    """Zero-copy slice of an EntryStore (a contiguous range of rows)."""
+
+    __slots__ = ("store", "start", "stop")
+
+    def __init__(self, store, start, stop):
+        self.store = store
+        self.start = start
+        self.stop = stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __iter__(self):
+        return (Entry(self.store, i) for i in range(self.start, self.stop))
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            if step != 1:
+                raise ValueError("EntryView slices must be contiguous")
+            return EntryView(self.store, self.start + start, self.start + max(start, stop))
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("EntryView index out of range")
+        return Entry(self.store, self.start + i)
+
+    def to_dicts(self):
+        return [e.to_dict() for e in self]
+
+
+class EntryStore:
+    """
+    Columnar container for pipeline entries.
+
+    Replaces the list of per-item dicts: each field lives in its own column,
+    `source` strings are interned into a small code table, and `published_at`
+    is parsed once into an int64 epoch array. Iterating or indexing yields
+    `Entry` row views, slicing yields zero-copy `EntryView`s, and the whole
+    store exports to Arrow / Parquet when pyarrow is installed. Keys beyond
+    FIELDS are kept in a sparse per-row side table.
+    """
+
+    def __init__(self, entries=None):
+        self.source_names = []
+        self._source_codes = {}
+        self.sources = array("I")
+        self.titles = []
+        self.texts = []
+        self.urls = []
+        self.published = array("q")
+        self.cluster_sizes = array("I")
+        self.signals = array("d")      # source popularity signal, NaN if none
+        self._extras = {}
+        if entries is not None:
+            self.extend(entries)
+
+    def __len__(self):
+        return len(self.titles)
+
+    def __iter__(self):
+        return (Entry(self, i) for i in range(len(self)))
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            if step != 1:
+                raise ValueError("EntryStore slices must be contiguous")
+            return EntryView(self, start, max(start, stop))
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("EntryStore index out of range")
+        return Entry(self, i)
+
+    # ------------------------------
+    # WRITING
+    # ------------------------------
+
+    def _source_code(self, source):
+        code = self._source_codes.get(source)
+        if code is None:
+            code = len(self.source_names)
+            self.source_names.append(sys.intern(source) if isinstance(source, str) else source)
+            self._source_codes[source] = code
+        return code
+
+    def append(self, entry):
+        """Copy one entry (dict or Entry) into the store; returns its row view."""
+        i = len(self)
+        if isinstance(entry, Entry):
+            src, j = entry.store, entry.index
+            self.sources.append(self._source_code(src.source_names[src.sources[j]]))
+            self.titles.append(src.titles[j])
+            self.texts.append(src.texts[j])
+            self.urls.append(src.urls[j])
+            self.published.append(src.published[j])
+            self.cluster_sizes.append(src.cluster_sizes[j])
+            self.signals.append(src.signals[j])
+            extra = src._extras.get(j)
+        else:
+            self.sources.append(self._source_code(entry.get("source")))
+            self.titles.append(entry.get("title"))
+            self.texts.append(entry.get("text"))
+            self.urls.append(entry.get("url"))
+            self.published.append(to_epoch(entry.get("published_at")))
+            self.cluster_sizes.append(entry.get("cluster_size") or 1)
+            self.signals.append(_to_signal(entry.get("signal")))
+            extra = {k: v for k, v in entry.items() if k not in FIELDS}
+        if extra:
+            self._extras[i] = dict(extra)
+        return Entry(self, i)
+
+    def extend(self, entries):
+        if isinstance(entries, EntryStore) and not entries._extras:
+            # Column concatenation, remapping source codes into this table
+            remap = [self._source_code(name) for name in entries.source_names]
+            self.sources.extend(remap[code] for code in entries.sources)
+            self.titles.extend(entries.titles)
+            self.texts.extend(entries.texts)
+            self.urls.extend(entries.urls)
+            self.published.extend(entries.published)
+            self.cluster_sizes.extend(entries.cluster_sizes)
+            self.signals.extend(entries.signals)
+            return
+        for entry in entries:
+            self.append(entry)
+
+    def select(self, predicate):
+        """New store with the rows for which `predicate(entry)` is true, in order."""
+        selected = EntryStore()
+        for entry in self:
+            if predicate(entry):
+                selected.append(entry)
+        return selected
+
+    # ------------------------------
+    # ROW ACCESS (used by Entry)
+    # ------------------------------
+
+    def value(self, i, key):
+        column = _PLAIN_COLUMNS.get(key)
+        if column is not None:
+            return getattr(self, column)[i]
+        if key == "source":
+            return self.source_names[self.sources[i]]
+        if key == "published_at":
+            return from_epoch(self.published[i])
+        if key == "signal":
+            signal = self.signals[i]
+            return None if math.isnan(signal) else signal
+        return self._extras.get(i, {})[key]
+
+    def set_value(self, i, key, value):
+        column = _PLAIN_COLUMNS.get(key)
+        if column is not None:
+            getattr(self, column)[i] = value
+        elif key == "published_at":
+            self.published[i] = to_epoch(value)
+        elif key == "signal":
+            self.signals[i] = _to_signal(value)
+        elif key == "source":
+            self.sources[i] = self._source_code(value)
+        else:
+            self._extras.setdefault(i, {})[key] = value
+
+    def to_dicts(self):
+        return [e.to_dict() for e in self]
+
+    # ------------------------------
+    # ARROW / PARQUET
+    # ------------------------------
+
+    def to_arrow(self):
+        """pyarrow Table with a dictionary-encoded source column and UTC timestamps."""
+        pa, _ = _arrow()
+        published = pa.array(
+            [None if ts == NO_TIMESTAMP else ts for ts in self.published],
+            type=pa.timestamp("s", tz="UTC"),
+        )
+        return pa.table({
+            "source": pa.DictionaryArray.from_arrays(
+                pa.array(self.sources, type=pa.uint32()), pa.array(self.source_names, type=pa.string())
+            ),
+            "title": pa.array(self.titles, type=pa.string()),
+            "text": pa.array(self.texts, type=pa.string()),
+            "url": pa.array(self.urls, type=pa.string()),
+            "published_at": published,
+            "cluster_size": pa.array(self.cluster_sizes, type=pa.uint32()),
+            "signal": pa.array([None if math.isnan(v) else v for v in self.signals], type=pa.float64()),
+        })
+
+    def write_parquet(self, path):
+        _, pq = _arrow()
+        pq.write_table(self.to_arrow(), path, compression="zstd")
+
+    @classmethod
+    def from_arrow(cls, table):
+        store = cls()
+        columns = table.to_pydict()
+        signals = columns.get("signal") or [None] * table.num_rows
+        for i, ts in enumerate(columns["published_at"]):
+            store.sources.append(store._source_code(columns["source"][i]))
+            store.titles.append(columns["title"][i])
+            store.texts.append(columns["text"][i])
+            store.urls.append(columns["url"][i])
+            store.published.append(NO_TIMESTAMP if ts is None else int(ts.timestamp()))
+            store.cluster_sizes.append(columns["cluster_size"][i] or 1)
+            store.signals.append(_to_signal(signals[i]))
+        return store
+
+    @classmethod
+    def read_parquet(cls, path):
+        _, pq = _arrow()
+        return cls.from_arrow(pq.read_table(path))
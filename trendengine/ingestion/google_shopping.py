@@ -1,4 +1,4 @@
-import requests
+from ingestion import http_client
 from datetime import datetime
 
 SEMRUSH_TRENDS_URL = (
@@ -11,7 +11,7 @@ def fetch_google_shopping_trends():
     items = []
 
     try:
-        r = requests.get(SEMRUSH_TRENDS_URL, timeout=10)
+        r = http_client.get(SEMRUSH_TRENDS_URL, conditional=True)
         data = r.json()
     except Exception as e:
         print("Error fetching Shopping Trends:", e)
@@ -0,0 +1,326 @@
+import base64
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import env
+from instrumentation import recorder
+from llm.rate_limiter import RateLimiter
+
+try:
+    import brotli  # noqa: F401  (lets urllib3 decode "br" responses)
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+# ------------------------------
+# CLIENT CONFIG
+# ------------------------------
+
+DEFAULT_TIMEOUT = 10
+POOL_CONNECTIONS = 32      # distinct hosts kept in the pool
+POOL_MAXSIZE = 16          # keep-alive connections per host
+
+HTTP_CACHE_DIR = env("HTTP_CACHE_DIR", os.path.join(".cache", "http"))
+
+# Offline record/replay: "live" (default), "record" or "replay"
+HTTP_MODE = env("HTTP_MODE", "live")
+HTTP_FIXTURE_DIR = env("HTTP_FIXTURE_DIR", os.path.join("fixtures", "http"))
+REPLAY_LATENCY_MS = float(env("HTTP_REPLAY_LATENCY_MS", 0))
+REPLAY_ERROR_RATE = float(env("HTTP_REPLAY_ERROR_RATE", 0))
+
+# Query parameters that carry credentials; never written to fixtures
+SECRET_PARAMS = ("apikey", "key", "api_key", "access_token")
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Process-wide requests.Session with keep-alive connection pooling."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = _make_adapter()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+                _session = session
+    return _session
+
+
+def configure(mode=None, fixture_dir=None, latency_ms=None, error_rate=None):
+    """Switch record/replay settings at runtime; the session is rebuilt on next use."""
+    global _session, HTTP_MODE, HTTP_FIXTURE_DIR, REPLAY_LATENCY_MS, REPLAY_ERROR_RATE
+    with _session_lock:
+        if mode is not None:
+            HTTP_MODE = mode
+        if fixture_dir is not None:
+            HTTP_FIXTURE_DIR = fixture_dir
+        if latency_ms is not None:
+            REPLAY_LATENCY_MS = latency_ms
+        if error_rate is not None:
+            REPLAY_ERROR_RATE = error_rate
+        _session = None
+
+
+def _make_adapter():
+    pool = dict(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+    if HTTP_MODE == "record":
+        return RecordingAdapter(HTTP_FIXTURE_DIR, **pool)
+    if HTTP_MODE == "replay":
+        return ReplayAdapter(HTTP_FIXTURE_DIR, REPLAY_LATENCY_MS, REPLAY_ERROR_RATE)
+    return HTTPAdapter(**pool)
+
+
+# ------------------------------
+# RECORD / REPLAY TRANSPORT
+# ------------------------------
+
+def redact_url(url):
+    """URL with credential query parameters removed."""
+    parts = urlsplit(url)
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in SECRET_PARAMS
+    ]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ""))
+
+
+def fixture_path(fixture_dir, method, url, body=None):
+    """Fixture file for a request: hash of method, redacted URL and body."""
+    h = hashlib.sha256()
+    h.update(f"{method.upper()} {redact_url(url)}".encode("utf-8"))
+    if body:
+        h.update(b"\0")
+        h.update(body if isinstance(body, bytes) else body.encode("utf-8"))
+    return os.path.join(fixture_dir, h.hexdigest()[:32] + ".json")
+
+
+def write_fixture(fixture_dir, method, url, status, headers, content, body=None):
+    path = fixture_path(fixture_dir, method, url, body)
+    os.makedirs(fixture_dir, exist_ok=True)
+    record = {
+        "method": method.upper(),
+        "url": redact_url(url),
+        "status": status,
+        "headers": {k: v for k, v in headers.items()
+                    if k.lower() not in ("content-encoding", "content-length", "transfer-encoding",
+                                         "set-cookie")},
+        "body_b64": base64.b64encode(content).decode("ascii"),
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(record, f)
+    return path
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Live transport that also saves every response as a fixture file."""
+
+    def __init__(self, fixture_dir, **kwargs):
+        super().__init__(**kwargs)
+        self.fixture_dir = fixture_dir
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        write_fixture(self.fixture_dir, request.method, request.url, response.status_code,
+                      response.headers, response.content, request.body)
+        return response
+
+
+class ReplayAdapter(HTTPAdapter):
+    """
+    Offline transport answering requests from fixture files.
+
+    Adds `latency_ms` per request and fails a random `error_rate` share of
+    them (alternating connection errors and 503s) to exercise retry paths.
+    Requests without a fixture get a 404.
+    """
+
+    def __init__(self, fixture_dir, latency_ms=0, error_rate=0):
+        super().__init__()
+        self.fixture_dir = fixture_dir
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+
+    def send(self, request, **kwargs):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+        if self.error_rate and random.random() < self.error_rate:
+            if random.random() < 0.5:
+                raise requests.exceptions.ConnectionError(f"injected failure for {request.url}")
+            return self._build(request, 503, {}, b"injected 503")
+
+        path = fixture_path(self.fixture_dir, request.method, request.url, request.body)
+        try:
+            with open(path, encoding="utf-8") as f:
+                record = json.load(f)
+        except OSError:
+            return self._build(request, 404, {}, b"no fixture recorded")
+        return self._build(request, record["status"], record["headers"],
+                           base64.b64decode(record["body_b64"]))
+
+    def _build(self, request, status, headers, content):
+        response = requests.Response()
+        response.status_code = status
+        response.headers.update(headers)
+        response._content = content
+        response.url = request.url
+        response.request = request
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.reason = "Replayed"
+        return response
+
+
+# ------------------------------
+# CONDITIONAL GET BODY CACHE
+# ------------------------------
+
+def _cache_paths(url, params):
+    raw = url + "?" + json.dumps(params or {}, sort_keys=True)
+    digest = hashlib.sha256(raw.encode("utf-8")).hexdigest()
+    base = os.path.join(HTTP_CACHE_DIR, digest[:2], digest)
+    return base + ".json", base + ".body"
+
+
+def _load_cached(url, params):
+    meta_path, body_path = _cache_paths(url, params)
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(body_path, "rb") as f:
+            body = f.read()
+    except (OSError, ValueError):
+        return None, None
+    return meta, body
+
+
+def _store_cached(url, params, response):
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if not etag and not last_modified:
+        return
+
+    meta_path, body_path = _cache_paths(url, params)
+    os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+    meta = {
+        "etag": etag,
+        "last_modified": last_modified,
+        "headers": {
+            k: v for k, v in response.headers.items()
+            if k.lower() in ("content-type", "etag", "last-modified")
+        },
+        "encoding": response.encoding,
+    }
+    # Write-then-rename so concurrent readers never see a torn file
+    for path, data, mode in ((body_path, response.content, "wb"),
+                             (meta_path, json.dumps(meta), "w")):
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, mode) as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+
+def _response_from_cache(url, meta, body, not_modified):
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response._content = body
+    response.headers.update(meta.get("headers", {}))
+    response.encoding = meta.get("encoding")
+    response.from_cache = True
+    response.not_modified = not_modified
+    return response
+
+
+# ------------------------------
+# PER-HOST RATE LIMITS
+# ------------------------------
+
+_host_limiters = {}
+
+
+def limit_host(host, rpm):
+    """Cap requests per minute to `host` across all threads; None removes the cap."""
+    if rpm:
+        limiter = _host_limiters.get(host)
+        if limiter is None or limiter.rpm != rpm:   # keep the window of an unchanged limit
+            _host_limiters[host] = RateLimiter(rpm=rpm)
+    else:
+        _host_limiters.pop(host, None)
+
+
+def _throttle(url):
+    # Replayed responses never reach the vendor, so they are not throttled
+    limiter = _host_limiters.get(urlsplit(url).netloc)
+    if limiter is not None and HTTP_MODE != "replay":
+        limiter.acquire()
+
+
+# ------------------------------
+# REQUESTS
+# ------------------------------
+
+def get(url, params=None, headers=None, timeout=DEFAULT_TIMEOUT, conditional=False):
+    """
+    GET through the shared pooled session.
+
+    With `conditional=True` the stored ETag / Last-Modified validators are
+    sent, and a 304 is answered from the local body cache as a normal 200
+    response with `not_modified = True`.
+    """
+    request_headers = dict(headers or {})
+    meta, body = (None, None)
+    # Fixtures must hold full bodies, so record/replay always fetch unconditionally
+    conditional = conditional and HTTP_MODE == "live"
+    if conditional:
+        meta, body = _load_cached(url, params)
+        if meta:
+            if meta.get("etag"):
+                request_headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                request_headers["If-Modified-Since"] = meta["last_modified"]
+
+    response = _send("get", url, params=params, headers=request_headers, timeout=timeout)
+
+    if conditional:
+        if response.status_code == 304 and meta is not None:
+            recorder.add(not_modified=1)
+            return _response_from_cache(response.url, meta, body, not_modified=True)
+        if response.status_code == 200:
+            _store_cached(url, params, response)
+
+    response.from_cache = False
+    response.not_modified = False
+    return response
+
+
+def post(url, timeout=DEFAULT_TIMEOUT, **kwargs):
+    """POST through the shared pooled session."""
+    return _send("post", url, timeout=timeout, **kwargs)
+
+
+def _send(method, url, **kwargs):
+    """
+    Throttled request; counts `requests` on the current span for every
+    request that reached the server (errors and 429s included, as vendors
+    bill them; registry.Reservation settles quota on this count).
+    """
+    _throttle(url)
+    try:
+        response = getattr(get_session(), method)(url, **kwargs)
+    except requests.ReadTimeout:
+        recorder.add(requests=1)
+        raise
+    recorder.add(requests=1, bytes=len(response.content))
+    return response
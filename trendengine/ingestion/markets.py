@@ -0,0 +1,51 @@
+# ------------------------------
+# MARKETS
+# ------------------------------
+
+# Locale of each market the engine can report on. Sources are shared between
+# markets that resolve to the same request (NewsAPI per language, Amazon per
+# storefront), so e.g. DE and AT fetch and summarize German news only once.
+MARKETS = {
+    "DE": {"name": "Germany", "language": "de", "amazon_host": "www.amazon.de"},
+    "AT": {"name": "Austria", "language": "de", "amazon_host": "www.amazon.de"},
+    "NL": {"name": "Netherlands", "language": "nl", "amazon_host": "www.amazon.nl"},
+    "BE": {"name": "Belgium", "language": "nl", "amazon_host": "www.amazon.com.be"},
+    "ES": {"name": "Spain", "language": "es", "amazon_host": "www.amazon.es"},
+    "IT": {"name": "Italy", "language": "it", "amazon_host": "www.amazon.it"},
+    "FR": {"name": "France", "language": "fr", "amazon_host": "www.amazon.fr"},
+    "PL": {"name": "Poland", "language": "pl", "amazon_host": "www.amazon.pl"},
+}
+
+# NewsAPI /everything only indexes these languages; others fall back to English
+NEWSAPI_LANGUAGES = {"ar", "de", "en", "es", "fr", "he", "it", "nl", "no", "pt", "ru", "sv", "ud", "zh"}
+
+
+def parse_markets(value):
+    """["DE", "NL"] from "de,nl"; raises ValueError for unknown market codes."""
+    codes = [code.strip().upper() for code in (value or "").split(",") if code.strip()]
+    unknown = [code for code in codes if code not in MARKETS]
+    if unknown:
+        raise ValueError(f"unknown market(s) {', '.join(unknown)}; known: {', '.join(MARKETS)}")
+    return list(dict.fromkeys(codes))
+
+
+def newsapi_language(market):
+    language = MARKETS[market]["language"]
+    return language if language in NEWSAPI_LANGUAGES else "en"
+
+
+def market_value(market, key):
+    """A market attribute: "code", "newsapi_language" or a MARKETS field such as "amazon_host"."""
+    if key == "code":
+        return market
+    if key == "newsapi_language":
+        return newsapi_language(market)
+    return MARKETS[market][key]
+
+
+def markets_sharing(markets, key):
+    """{value of `key`: tuple of markets with that value}, e.g. by language."""
+    groups = {}
+    for market in markets:
+        groups.setdefault(market_value(market, key), []).append(market)
+    return {value: tuple(group) for value, group in groups.items()}
@@ -1,5 +1,15 @@
-import feedparser
-from datetime import datetime, timezone
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from config import env
+from ingestion import http_client
+from ingestion.scheduler import IngestionScheduler
+
+# Streaming parser for well-formed feeds; feedparser is the lenient fallback
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
 
 GOOGLE_QUERIES = [
     "smart home",
@@ -18,43 +28,161 @@ RSS_FEEDS = [
     "https://www.gsmarena.com/rss-news-reviews.php3",
 ]
 
-def fetch_google_news_rss():
-    print("Fetching Google News RSS…")
-    items = []
+GOOGLE_NEWS_HOST = "news.google.com"
 
-    for query in GOOGLE_QUERIES:
-        url = f"https://news.google.com/rss/search?q={query.replace(' ', '+')}"
-        feed = feedparser.parse(url)
+# "auto" parses with lxml and falls back to feedparser when lxml is missing
+# or the feed is malformed; "feedparser" always uses feedparser
+FEED_PARSER = env("FEED_PARSER", "auto")
 
-        for entry in feed.entries:
-            items.append({
-                "source": "GoogleNews",
-                "title": entry.title,
-                "text": entry.summary if hasattr(entry, "summary") else entry.title,
-                "url": entry.link,
-                "published_at": entry.published if hasattr(entry, "published") else None
-            })
+# Items kept per feed; parsing stops there, so a huge feed costs no more
+# memory than a small one
+MAX_ITEMS_PER_FEED = 200
 
-    print(f"Google News RSS collected: {len(items)}")
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+RSS1_NS = "{http://purl.org/rss/1.0/}"
+ITEM_TAGS = ("item", ATOM_NS + "entry", RSS1_NS + "item")
+
+
+# ------------------------------
+# PARSING
+# ------------------------------
+
+def _localname(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def _item_fields(item):
+    """{localname: text} of an RSS item / Atom entry, plus its link."""
+    fields, link = {}, None
+    for child in item:
+        if not isinstance(child.tag, str):   # comments, processing instructions
+            continue
+        name = _localname(child.tag)
+        if name == "link" and child.get("href") is not None:
+            # Atom: prefer the alternate (HTML) link over self/enclosure links
+            if link is None or child.get("rel", "alternate") == "alternate":
+                link = child.get("href")
+            continue
+        fields.setdefault(name, "".join(child.itertext()).strip())
+    return fields, link or fields.get("link")
+
+
+def _parse_lxml(content, source):
+    """Entries of a feed, parsed incrementally; each item is freed once read."""
+    items = []
+    parser = etree.iterparse(
+        BytesIO(content), events=("end",), tag=ITEM_TAGS,
+        resolve_entities=False, no_network=True,
+    )
+    for _, item in parser:
+        fields, link = _item_fields(item)
+        # Drop the finished item and its already-read siblings
+        item.clear()
+        while item.getprevious() is not None:
+            del item.getparent()[0]
+
+        title = fields.get("title")
+        items.append({
+            "source": source,
+            "title": title,
+            "text": fields.get("description") or fields.get("summary") or fields.get("content") or title,
+            "url": link,
+            "published_at": fields.get("pubDate") or fields.get("published")
+                            or fields.get("date") or fields.get("updated"),
+        })
+        if len(items) >= MAX_ITEMS_PER_FEED:
+            break
     return items
 
 
-def fetch_rss_feeds():
-    print("Fetching RSS feeds (TechCrunch, Verge, Wired…)")
+def _parse_feedparser(content, source, headers=None):
+    import feedparser   # slow import, only needed for the fallback
+
+    feed = feedparser.parse(content, response_headers=headers or {})
     items = []
+    for entry in feed.entries[:MAX_ITEMS_PER_FEED]:
+        items.append({
+            "source": source,
+            "title": entry.title,
+            "text": entry.summary if hasattr(entry, "summary") else entry.title,
+            "url": entry.link,
+            "published_at": entry.published if hasattr(entry, "published") else None
+        })
+    return items
+
+
+def parse_feed(content, source, headers=None, parser=None):
+    """Pipeline entries from a downloaded RSS / Atom document."""
+    parser = parser or FEED_PARSER
+    if parser == "auto" and etree is not None:
+        try:
+            return _parse_lxml(content, source)
+        except etree.XMLSyntaxError:
+            pass   # malformed feed: feedparser recovers what it can
+    elif parser == "lxml":
+        if etree is None:
+            raise ValueError("Feed parser 'lxml' is not available")
+        return _parse_lxml(content, source)
+    return _parse_feedparser(content, source, headers)
 
-    for feed_url in RSS_FEEDS:
-        parsed = feedparser.parse(feed_url)
 
-        for entry in parsed.entries:
-            items.append({
-                "source": feed_url,
-                "title": entry.title,
-                "text": entry.summary if hasattr(entry, "summary") else entry.title,
-                "url": entry.link,
-                "published_at": entry.published if hasattr(entry, "published") else None
-            })
+# ------------------------------
+# FETCHING
+# ------------------------------
 
+def _fetch_feed(url, source):
+    """Download a feed over the pooled client (conditional GET) and parse it."""
+    try:
+        r = http_client.get(url, conditional=True)
+        r.raise_for_status()
+    except Exception as e:
+        print(f"Error fetching feed {url}: {e}")
+        return []
+    headers = {k.lower(): v for k, v in r.headers.items()}
+    return parse_feed(r.content, source, headers)
+
+
+def iter_google_news_query(query, language=None, country=None):
+    """Yield Google News RSS search results for one query, optionally localized (e.g. "de", "AT")."""
+    url = f"https://{GOOGLE_NEWS_HOST}/rss/search?q={query.replace(' ', '+')}"
+    if language and country:
+        url += f"&hl={language}&gl={country}&ceid={country}:{language}"
+    yield from _fetch_feed(url, "GoogleNews")
+
+
+def iter_rss_feed(feed_url):
+    """Yield the entries of a single RSS/Atom feed."""
+    yield from _fetch_feed(feed_url, feed_url)
+
+
+def fetch_google_news_query(query):
+    """Fetch the Google News RSS search results for one query."""
+    return list(iter_google_news_query(query))
+
+
+def fetch_rss_feed(feed_url):
+    """Fetch and parse a single RSS/Atom feed."""
+    return list(iter_rss_feed(feed_url))
+
+
+def _fetch_concurrently(fn, args, host_of):
+    """Run `fn(arg)` for every arg on an IngestionScheduler (per-host limits apply)."""
+    scheduler = IngestionScheduler()
+    for arg in args:
+        scheduler.add(host_of(arg), fn, arg)
+    return scheduler.run().to_dicts()
+
+
+def fetch_google_news_rss(queries=None):
+    print("Fetching Google News RSS…")
+    items = _fetch_concurrently(iter_google_news_query, queries or GOOGLE_QUERIES, lambda q: GOOGLE_NEWS_HOST)
+    print(f"Google News RSS collected: {len(items)}")
+    return items
+
+
+def fetch_rss_feeds(feed_urls=None):
+    print("Fetching RSS feeds (TechCrunch, Verge, Wired…)")
+    items = _fetch_concurrently(iter_rss_feed, feed_urls or RSS_FEEDS, lambda url: urlsplit(url).netloc)
     print(f"Other RSS sources collected: {len(items)}")
     return items
 
@@ -1,17 +1,20 @@
-import os
-import requests
-from dotenv import load_dotenv
-
-load_dotenv()
-
-PRODUCT_HUNT_API_KEY = os.getenv("PRODUCT_HUNT_API_KEY")
+from config import PRODUCT_HUNT_API_KEY
+from ingestion import http_client
+from ingestion.seen_index import fetch_watermark, finish_listing, reached_watermark
 
 GRAPHQL_URL = "https://api.producthunt.com/v2/api/graphql"
 
-# SAFE GraphQL query (always supported)
+PAGE_SIZE = 30
+MAX_PAGES = 3
+
+# SAFE GraphQL query (always supported); pages follow pageInfo.endCursor
 QUERY = """
-query {
-  posts(first: 30, order: VOTES) {
+query ($first: Int!, $after: String) {
+  posts(first: $first, after: $after, order: VOTES) {
+    pageInfo {
+      endCursor
+      hasNextPage
+    }
     edges {
       node {
         name
@@ -26,39 +29,19 @@ query {
 """
 
 
-def fetch_product_hunt():
-    print("Fetching Product Hunt trending products…")
-
-    if not PRODUCT_HUNT_API_KEY:
-        print("PRODUCT_HUNT_API_KEY is missing in .env")
-        return []
-
-    headers = {
-        "Authorization": f"Bearer {PRODUCT_HUNT_API_KEY}",
-        "Content-Type": "application/json",
-        "Accept": "application/json",
-    }
-
-    # --------------------------
-    # Perform the API request
-    # --------------------------
+def _fetch_page(headers, after=None):
+    """(items, next cursor) of one page of posts; ([], None) on any error."""
+    variables = {"first": PAGE_SIZE, "after": after}
     try:
-        response = requests.post(
+        response = http_client.post(
             GRAPHQL_URL,
-            json={"query": QUERY},
+            json={"query": QUERY, "variables": variables},
             headers=headers,
             timeout=15
         )
     except Exception as e:
         print(f"Network error fetching Product Hunt: {e}")
-        return []
-
-    # --------------------------
-    # Debug: show raw response text
-    # --------------------------
-    print("\n----- RAW RESPONSE -----")
-    print(response.text)
-    print("----- END RAW RESPONSE -----\n")
+        return [], None
 
     # --------------------------
     # Try parsing JSON safely
@@ -67,23 +50,18 @@ def fetch_product_hunt():
         data = response.json()
     except Exception as e:
         print(f"Could not decode JSON: {e}")
-        return []
+        return [], None
 
     # If Product Hunt sent an error message
     if "errors" in data:
         print("Product Hunt returned errors:")
         print(data["errors"])
-        return []
-
-    posts_data = (
-        data.get("data", {})
-            .get("posts", {})
-            .get("edges", [])
-    )
+        return [], None
 
+    posts = data.get("data", {}).get("posts", {})
     items = []
 
-    for edge in posts_data:
+    for edge in posts.get("edges", []):
         node = edge.get("node", {})
         if not node:
             continue
@@ -94,8 +72,46 @@ def fetch_product_hunt():
             "text": node.get("tagline"),
             "url": node.get("url"),
             "published_at": node.get("createdAt"),
+            "signal": node.get("votesCount"),
         })
 
+    page_info = posts.get("pageInfo") or {}
+    cursor = page_info.get("endCursor") if page_info.get("hasNextPage") else None
+    return items, cursor
+
+
+def fetch_product_hunt(max_pages=MAX_PAGES, stop_at_watermark=False):
+    """
+    Top Product Hunt posts, following the GraphQL cursor for up to `max_pages` pages.
+
+    Posts are ordered by votes, not date, so with `stop_at_watermark`
+    (incremental runs) paging stops once a whole page is older than the
+    newest post of the last run; the rest of the last run's listing is
+    kept instead (see finish_listing).
+    """
+    print("Fetching Product Hunt trending products…")
+
+    if not PRODUCT_HUNT_API_KEY:
+        print("PRODUCT_HUNT_API_KEY is missing in .env")
+        return []
+
+    headers = {
+        "Authorization": f"Bearer {PRODUCT_HUNT_API_KEY}",
+        "Content-Type": "application/json",
+        "Accept": "application/json",
+    }
+    watermark = fetch_watermark("producthunt") if stop_at_watermark else None
+
+    items, cursor, stopped = [], None, False
+    for _ in range(max_pages):
+        page_items, cursor = _fetch_page(headers, cursor)
+        items.extend(page_items)
+        stopped = bool(cursor) and reached_watermark(page_items, watermark)
+        if not cursor or stopped:
+            break
+
+    if stop_at_watermark:
+        items.extend(finish_listing("producthunt", items, stopped, PAGE_SIZE * max_pages))
     print(f"Product Hunt items collected: {len(items)}")
     return items
 
@@ -1,33 +1,76 @@
-import requests
+from ingestion import http_client
+from ingestion.seen_index import fetch_watermark, finish_listing, reached_watermark
 from datetime import datetime, timezone
 
+REDDIT_HOST = "www.reddit.com"
+HEADERS = {"User-Agent": "trend-agent/1.0"}
+
+
+# Listing pages followed through the `after` cursor (limit is per page, max 100)
+REDDIT_MAX_PAGES = 3
+
+
+def _post_entry(sub, p):
+    return {
+        "source": f"reddit/{sub}",
+        "title": p["title"],
+        "text": (p.get("selftext") or p["title"]),
+        "url": "https://www.reddit.com" + p["permalink"],
+        "published_at": datetime.fromtimestamp(
+            p["created_utc"], tz=timezone.utc
+        ).isoformat(),
+        "signal": p.get("score"),
+    }
+
+
+def iter_subreddit(sub, limit=50, max_pages=REDDIT_MAX_PAGES, stop_at_watermark=False):
+    """
+    Yield posts from the hot listing of a single subreddit as they are parsed.
+
+    Follows the `after` cursor for up to `max_pages` pages. With
+    `stop_at_watermark` (incremental runs), stops after a page whose posts
+    are all older than the newest post of the previous run and yields the
+    rest of the previous listing instead (see finish_listing). The cursor
+    makes pages sequential.
+    """
+    print(f"Fetching Reddit: r/{sub}")
+    key = f"reddit/{sub}"
+    watermark = fetch_watermark(key) if stop_at_watermark else None
+    url = f"https://{REDDIT_HOST}/r/{sub}/hot.json?limit={limit}"
+    fetched, stopped = [], False
+
+    try:
+        after = None
+        for page in range(max_pages):
+            page_url = url if after is None else f"{url}&after={after}"
+            r = http_client.get(page_url, headers=HEADERS, conditional=page == 0)
+            data = r.json()["data"]
+
+            posts = [_post_entry(sub, child["data"]) for child in data["children"]]
+            yield from posts
+            fetched.extend(posts)
+
+            after = data.get("after")
+            stopped = bool(after) and reached_watermark(posts, watermark)
+            if not after or stopped:
+                break
+
+    except Exception as e:
+        print(f"Error fetching r/{sub}: {e}")
+
+    if stop_at_watermark:
+        yield from finish_listing(key, fetched, stopped, limit * max_pages)
+
+
+def fetch_subreddit(sub, limit=50, max_pages=REDDIT_MAX_PAGES):
+    """Fetch the hot listing of a single subreddit."""
+    return list(iter_subreddit(sub, limit, max_pages))
+
+
 def fetch_reddit_json(subreddits, limit=50):
     all_posts = []
-    headers = {"User-Agent": "trend-agent/1.0"}
 
     for sub in subreddits:
-        print(f"Fetching Reddit: r/{sub}")
-        url = f"https://www.reddit.com/r/{sub}/hot.json?limit={limit}"
-
-        try:
-            r = requests.get(url, headers=headers, timeout=10)
-            data = r.json()
-
-            for child in data["data"]["children"]:
-                p = child["data"]
-
-                post = {
-                    "source": f"reddit/{sub}",
-                    "title": p["title"],
-                    "text": (p.get("selftext") or p["title"]),
-                    "url": "https://www.reddit.com" + p["permalink"],
-                    "published_at": datetime.fromtimestamp(
-                        p["created_utc"], tz=timezone.utc
-                    ).isoformat(),
-                }
-                all_posts.append(post)
-
-        except Exception as e:
-            print(f"Error fetching r/{sub}: {e}")
+        all_posts.extend(fetch_subreddit(sub, limit))
 
     return all_posts
@@ -0,0 +1,355 @@
+import functools
+import importlib
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+from config import env
+from ingestion import http_client
+from instrumentation import recorder
+from ingestion.markets import market_value, markets_sharing
+
+# ------------------------------
+# REGISTRY CONFIG
+# ------------------------------
+
+SOURCES_PATH = env(
+    "TREND_SOURCES_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sources.json"),
+)
+QUOTA_PATH = env("SOURCE_QUOTA_PATH", os.path.join(".cache", "source_quota.sqlite3"))
+
+DEFAULT_PRIORITY = 5
+DEFAULT_REFRESH_MINUTES = 60
+DAY_SECONDS = 24 * 3600
+
+
+def resolve(dotted):
+    """The object behind "package.module:name", importing the module on first use."""
+    module, _, name = dotted.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+class Source:
+    """
+    One entry of sources.json.
+
+      name              unique id, also the quota / refresh bookkeeping key
+      fetcher           "module:function" returning or yielding entries
+      host / host_from  host for rate limits, or the kwarg holding a URL
+      kwargs            fixed keyword arguments for every call
+      fan_out           {kwarg: [values] or {"call": "module:function"}},
+                        one call per combination of values
+      rate_limit        {"rpm": n, "concurrency": n} for the host
+      quota             {"pool": name, "units_per_call": n, "daily_units": n};
+                        units are per request, reserved for kwargs max_pages
+                        and refunded for requests a call did not send
+      refresh_minutes   how often the source is worth fetching again
+      priority          1 is scheduled (and given quota) first
+      incremental       the fetcher takes `stop_at_watermark`, which is set
+                        for incremental runs (see seen_index.finish_listing)
+      markets           {"scope": ..., "args": {kwarg: market field},
+                         "fan_out": {...}} for multi-market runs; scope
+                        "shared" (default), "code", "newsapi_language",
+                        "amazon_host" sets which markets share a call
+    """
+
+    def __init__(self, spec):
+        self.name = spec["name"]
+        self.fetcher_path = spec["fetcher"]
+        self.enabled = spec.get("enabled", True)
+        self.host = spec.get("host")
+        self.host_from = spec.get("host_from")
+        if not self.host and not self.host_from:
+            raise ValueError(f"source {self.name}: needs 'host' or 'host_from'")
+        self.kwargs = spec.get("kwargs", {})
+        self.fan_out = spec.get("fan_out", {})
+        rate_limit = spec.get("rate_limit", {})
+        self.rpm = rate_limit.get("rpm")
+        self.concurrency = rate_limit.get("concurrency")
+        self.quota = spec.get("quota")
+        self.refresh_seconds = 60 * spec.get("refresh_minutes", DEFAULT_REFRESH_MINUTES)
+        self.priority = spec.get("priority", DEFAULT_PRIORITY)
+        self.incremental = spec.get("incremental", False)
+        self.markets = spec.get("markets", {})
+        self._fetcher = None
+
+    @property
+    def fetcher(self):
+        if self._fetcher is None:
+            self._fetcher = resolve(self.fetcher_path)
+        return self._fetcher
+
+    def _fan_out_values(self, spec, market=None):
+        if isinstance(spec, list):
+            return spec
+        args = {k: market_value(market, v) for k, v in spec.get("args", {}).items()} if market else {}
+        return list(resolve(spec["call"])(**args))
+
+    def calls(self, market=None):
+        """[(host, kwargs)] of every call this source makes (for one market, if given)."""
+        kwargs = dict(self.kwargs)
+        fan_out = self.fan_out
+        if market is not None:
+            kwargs.update({k: market_value(market, v) for k, v in self.markets.get("args", {}).items()})
+            fan_out = {**fan_out, **self.markets.get("fan_out", {})}
+
+        keys = list(fan_out)
+        values = [self._fan_out_values(fan_out[k], market) for k in keys]
+        calls = []
+        for combo in itertools.product(*values):
+            call_kwargs = {**kwargs, **dict(zip(keys, combo))}
+            host = self.host or urlsplit(call_kwargs[self.host_from]).netloc
+            calls.append((host, call_kwargs))
+        return calls
+
+    def market_groups(self, markets):
+        """{markets tuple: representative market} sharing one set of calls."""
+        scope = self.markets.get("scope", "shared")
+        if scope == "shared":
+            return {tuple(markets): None}
+        return {group: group[0] for group in markets_sharing(markets, scope).values()}
+
+
+def load_sources(path=SOURCES_PATH):
+    """Enabled sources from the registry file, highest priority first."""
+    with open(path, encoding="utf-8") as f:
+        specs = json.load(f)["sources"]
+    sources = [Source(spec) for spec in specs]
+    names = [s.name for s in sources]
+    duplicates = {n for n in names if names.count(n) > 1}
+    if duplicates:
+        raise ValueError(f"duplicate source names in {path}: {', '.join(sorted(duplicates))}")
+    return sorted((s for s in sources if s.enabled), key=lambda s: s.priority)
+
+
+def host_limits(sources):
+    """{host: max concurrent requests} declared by sources with a fixed host."""
+    return {s.host: s.concurrency for s in sources if s.host and s.concurrency}
+
+
+# ------------------------------
+# QUOTA LEDGER
+# ------------------------------
+
+class QuotaLedger:
+    """
+    Persistent per-day quota usage per pool and last fetch time per source.
+
+    Daily budgets are paced over the (UTC) day: by time t a pool may have
+    spent at most the share of its budget for the day so far plus one
+    refresh interval, so hourly runs cannot burn the whole allowance in
+    the morning while unused allowance still carries over to later runs.
+    """
+
+    def __init__(self, path=QUOTA_PATH):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS usage (
+                    pool TEXT NOT NULL,
+                    day INTEGER NOT NULL,
+                    units REAL NOT NULL,
+                    PRIMARY KEY (pool, day)
+                );
+                CREATE TABLE IF NOT EXISTS fetches (
+                    source TEXT PRIMARY KEY,
+                    fetched_at REAL NOT NULL
+                );
+            """)
+        return self._conn
+
+    def used(self, pool, now=None):
+        day = int((now or time.time()) // DAY_SECONDS)
+        with self._lock:
+            row = self._db().execute("SELECT units FROM usage WHERE pool = ? AND day = ?", (pool, day)).fetchone()
+        return row[0] if row else 0
+
+    def available(self, pool, daily_units, pace_seconds, now=None):
+        """Units the pool may spend now under the paced daily budget."""
+        now = now or time.time()
+        elapsed = now % DAY_SECONDS
+        allowance = daily_units * min(1.0, (elapsed + pace_seconds) / DAY_SECONDS)
+        return max(0, allowance - self.used(pool, now))
+
+    def charge(self, pool, units, now=None):
+        day = int((now or time.time()) // DAY_SECONDS)
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT INTO usage (pool, day, units) VALUES (?, ?, ?) "
+                "ON CONFLICT(pool, day) DO UPDATE SET units = units + excluded.units",
+                (pool, day, units),
+            )
+            db.execute("DELETE FROM usage WHERE day < ?", (day - 7,))
+            db.commit()
+
+    def last_fetch(self, source):
+        with self._lock:
+            row = self._db().execute("SELECT fetched_at FROM fetches WHERE source = ?", (source,)).fetchone()
+        return row[0] if row else None
+
+    def mark_fetched(self, source, now=None):
+        with self._lock:
+            db = self._db()
+            db.execute("INSERT OR REPLACE INTO fetches (source, fetched_at) VALUES (?, ?)",
+                       (source, now or time.time()))
+            db.commit()
+
+
+# ------------------------------
+# SCHEDULING
+# ------------------------------
+
+def is_due(source, ledger, now=None):
+    last = ledger.last_fetch(source.name)
+    return last is None or (now or time.time()) - last >= source.refresh_seconds
+
+
+def schedule_sources(scheduler, sources, ledger=None, markets=None, only_due=False, tag_source=False,
+                     incremental=False, now=None):
+    """
+    Queue every call of `sources` on an IngestionScheduler, in priority order.
+
+    Hosts get the declared rpm (enforced per request by http_client) and
+    concurrency caps. Calls to a quota pool are cut to what the paced daily
+    budget allows and reserved up front, so concurrent calls can never
+    overspend it; as each call finishes, the requests it did not send are
+    refunded (see Reservation), and tasks dropped unrun must be handed to
+    release_tasks. A source counts as fetched once its calls are done
+    and at least one returned items, so a failed refresh is retried on the
+    next run instead of waiting out the refresh interval.
+
+    With `markets`, each task is grouped under the markets sharing it (see
+    TrendAgent.analyze_markets); `tag_source` makes the group (source name,
+    markets) so results can be kept per source. `only_due` skips sources
+    fetched within their refresh interval. `incremental` lets paginating
+    sources stop at their fetch watermark. Returns {source: calls}.
+    """
+    now = now or time.time()
+    scheduled = {}
+    for source in sources:
+        if only_due and ledger is not None and not is_due(source, ledger, now):
+            continue
+
+        if markets:
+            groups = [(group, source.calls(market)) for group, market in source.market_groups(markets).items()]
+        else:
+            groups = [(None, source.calls())]
+        total = sum(len(calls) for _, calls in groups)
+
+        if source.quota and ledger is not None:
+            # units_per_call is per request; paginating fetchers make up to max_pages
+            pool = source.quota["pool"]
+            cost = source.quota.get("units_per_call", 1) * source.kwargs.get("max_pages", 1)
+            affordable = int(ledger.available(pool, source.quota["daily_units"], source.refresh_seconds, now) // cost)
+            if affordable < total:
+                print(f"🪙 {source.name}: quota allows {affordable}/{total} calls ({pool})")
+                groups = _truncate(groups, affordable)
+                total = affordable
+            if total:
+                ledger.charge(pool, total * cost, now)
+
+        if not total:
+            continue
+        scheduled[source.name] = total
+        fetcher = source.fetcher
+        if ledger is not None:
+            fetcher = Reservation(source, ledger, total, now).wrap(fetcher)
+
+        for group, calls in groups:
+            for host, kwargs in calls:
+                if source.incremental:
+                    kwargs["stop_at_watermark"] = incremental
+                if source.rpm:
+                    http_client.limit_host(host, source.rpm)
+                if source.concurrency:
+                    scheduler.host_limits[host] = source.concurrency
+                scheduler.add_to((source.name, group) if tag_source else group, host, fetcher, **kwargs)
+    return scheduled
+
+
+class Reservation:
+    """
+    Settles one scheduled source in the ledger as its calls finish.
+
+    Each call is charged for the HTTP requests it actually sent, as counted
+    by http_client on the call's fetch span: a call that stopped early, or
+    never reached the server, gets the rest of its max_pages reservation
+    back, while empty pages, errors and 429s still count as the vendor
+    bills them. When the last call is done the source is marked fetched,
+    if any call returned items; items kept from an earlier fetch
+    ("retained") were not requested, so they do not count.
+    """
+
+    def __init__(self, source, ledger, calls, now):
+        self.source = source
+        self.ledger = ledger
+        self.now = now
+        self.remaining = calls
+        self.fetched = False
+        self._lock = threading.Lock()
+
+    def wrap(self, fetcher):
+        @functools.wraps(fetcher)
+        def fetch(*args, **kwargs):
+            span = recorder.current()   # the scheduler's fetch span
+            sent = span.counters["requests"] if span is not None else None
+            items = 0
+            try:
+                for entry in fetcher(*args, **kwargs) or []:
+                    if not entry.get("retained"):
+                        items += 1
+                    yield entry
+            finally:
+                max_pages = kwargs.get("max_pages", 1)
+                requests = span.counters["requests"] - sent if span is not None else max_pages
+                self.settle(max_pages, requests, items)
+
+        fetch.reservation = self
+        return fetch
+
+    def settle(self, max_pages, requests, items=0, released=False):
+        quota = self.source.quota
+        if quota and requests != max_pages:
+            # Refund (or top up) against the day it was reserved on
+            units = (requests - max_pages) * quota.get("units_per_call", 1)
+            self.ledger.charge(quota["pool"], units, self.now)
+
+        with self._lock:
+            self.remaining -= 1
+            self.fetched = self.fetched or items > 0
+            done = self.remaining == 0
+        if done:
+            if self.fetched:
+                self.ledger.mark_fetched(self.source.name)
+            elif not released:
+                print(f"⚠️ {self.source.name}: no items fetched; it stays due for the next run")
+
+
+def release_tasks(tasks):
+    """Refund the reservations of scheduled tasks that will never run (e.g. on resume)."""
+    for _, _, fn, _, kwargs in tasks:
+        reservation = getattr(fn, "reservation", None)
+        if reservation is not None:
+            reservation.settle(kwargs.get("max_pages", 1), 0, released=True)
+
+
+def _truncate(groups, limit):
+    kept = []
+    for group, calls in groups:
+        kept.append((group, calls[:max(0, limit)]))
+        limit -= len(calls)
+    return kept
@@ -0,0 +1,151 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from ingestion.entry_store import EntryStore
+from instrumentation import span
+
+# ------------------------------
+# DEFAULT LIMITS
+# ------------------------------
+
+MAX_WORKERS = 16
+PER_HOST_LIMIT = 4
+
+# Max entries parsed but not yet consumed in streaming mode (backpressure)
+STREAM_BUFFER_SIZE = 1000
+
+_TASK_DONE = object()
+
+
+def _task_name(fn):
+    return getattr(fn, "__name__", repr(fn))
+
+
+def _task_args(args, kwargs):
+    return list(args) + [f"{k}={v}" for k, v in kwargs.items()]
+
+
+class IngestionScheduler:
+    """
+    Runs fetch tasks concurrently on a thread pool.
+
+    Every task is tagged with the host it talks to. At most `max_workers`
+    tasks run at once overall and at most `per_host_limit` (or the override
+    in `host_limits`) against any single host. Results are merged in the
+    order tasks were added, so the output does not depend on which request
+    happened to finish first.
+
+    Tasks can be tagged with a group (e.g. the markets a source serves) and
+    collected per group with `run_groups`, still in one shared pool.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, per_host_limit=PER_HOST_LIMIT, host_limits=None):
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.host_limits = dict(host_limits or {})
+        self.tasks = []
+        self._host_semaphores = {}
+        self._lock = threading.Lock()
+
+    def add(self, host, fn, *args, **kwargs):
+        """Queue `fn(*args, **kwargs)`; it must return a list or iterator of entries."""
+        self.tasks.append((None, host, fn, args, kwargs))
+
+    def add_to(self, group, host, fn, *args, **kwargs):
+        """`add` with a group key for `run_groups`."""
+        self.tasks.append((group, host, fn, args, kwargs))
+
+    def _semaphore(self, host):
+        with self._lock:
+            sem = self._host_semaphores.get(host)
+            if sem is None:
+                limit = self.host_limits.get(host, self.per_host_limit)
+                sem = threading.BoundedSemaphore(max(1, limit))
+                self._host_semaphores[host] = sem
+            return sem
+
+    def _run_task(self, task):
+        _, host, fn, args, kwargs = task
+        with self._semaphore(host), span(_task_name(fn), "fetch", host=host, args=_task_args(args, kwargs)) as s:
+            try:
+                entries = EntryStore(fn(*args, **kwargs) or [])
+            except Exception as e:
+                print(f"⚠️ Fetch task {_task_name(fn)}{tuple(_task_args(args, kwargs))} failed: {e}")
+                s.error = repr(e)
+                entries = EntryStore()
+            s.add(items=len(entries))
+            return entries
+
+    def run_groups(self):
+        """Execute all queued tasks; returns {group: EntryStore}, groups in first-added order."""
+        tasks, self.tasks = self.tasks, []
+        if not tasks:
+            return {}
+
+        workers = max(1, min(self.max_workers, len(tasks)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # pool.map yields in submission order -> stable merge
+            results = list(pool.map(self._run_task, tasks))
+
+        groups = {}
+        for (group, *_), entries in zip(tasks, results):
+            groups.setdefault(group, EntryStore()).extend(entries)
+        return groups
+
+    def run(self):
+        """Execute all queued tasks and return their entries as one EntryStore."""
+        merged = EntryStore()
+        for entries in self.run_groups().values():
+            merged.extend(entries)
+        return merged
+
+    def stream(self, buffer_size=STREAM_BUFFER_SIZE):
+        """
+        Execute all queued tasks and yield entries as soon as they are parsed.
+
+        Entries arrive in completion order, not task order. Workers block
+        once `buffer_size` entries are waiting, so a slow consumer bounds
+        memory instead of letting results pile up.
+        """
+        tasks, self.tasks = self.tasks, []
+        if not tasks:
+            return
+
+        buffer = queue.Queue(maxsize=buffer_size)
+        stop = threading.Event()
+
+        def worker(task):
+            _, host, fn, args, kwargs = task
+            try:
+                with self._semaphore(host), span(_task_name(fn), "fetch", host=host, args=_task_args(args, kwargs)) as s:
+                    for entry in fn(*args, **kwargs) or []:
+                        if stop.is_set():
+                            break
+                        buffer.put(entry)
+                        s.add(items=1)
+            except Exception as e:
+                print(f"⚠️ Fetch task {_task_name(fn)}{tuple(_task_args(args, kwargs))} failed: {e}")
+            finally:
+                buffer.put(_TASK_DONE)
+
+        workers = max(1, min(self.max_workers, len(tasks)))
+        pool = ThreadPoolExecutor(max_workers=workers)
+        for task in tasks:
+            pool.submit(worker, task)
+
+        remaining = len(tasks)
+        try:
+            while remaining:
+                item = buffer.get()
+                if item is _TASK_DONE:
+                    remaining -= 1
+                else:
+                    yield item
+        finally:
+            # Consumer stopped early: let blocked workers finish and exit
+            stop.set()
+            while remaining:
+                if buffer.get() is _TASK_DONE:
+                    remaining -= 1
+            pool.shutdown(wait=True)
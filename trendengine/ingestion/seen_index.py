@@ -0,0 +1,352 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from config import env
+
+# ------------------------------
+# INDEX CONFIG
+# ------------------------------
+
+INDEX_PATH = env("SEEN_INDEX_PATH", os.path.join(".cache", "seen_index.sqlite3"))
+
+# Batch summaries older than this are not reused; their items get re-analyzed
+SUMMARY_RETENTION_SECONDS = 7 * 24 * 3600
+
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "ref", "ocid", "cmpid")
+
+
+def normalize_url(url):
+    """Canonical form of a URL for dedup: lowercase host, no fragment or tracking params."""
+    parts = urlsplit(url.strip())
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(TRACKING_PARAMS)
+    ]
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((
+        parts.scheme.lower() or "https",
+        parts.netloc.lower(),
+        path,
+        urlencode(sorted(query)),
+        "",
+    ))
+
+
+def entry_key(entry):
+    """Stable identity of an entry: normalized URL, else source + title."""
+    if entry.get("url"):
+        return normalize_url(entry["url"])
+    raw = f"{entry.get('source')}\0{entry.get('title')}"
+    return "id:" + hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def scoped_key(entry, scope=None):
+    """entry_key, prefixed with the scope the entry was analyzed under."""
+    key = entry_key(entry)
+    return f"{scope}|{key}" if scope else key
+
+
+def parse_published(value):
+    """Parse ISO-8601 or RFC-822 timestamps into aware UTC datetimes (None if unknown)."""
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (TypeError, ValueError):
+        try:
+            dt = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def track_newest(newest, entry):
+    """Fold one entry into a {source: newest published datetime} map."""
+    ts = getattr(entry, "published_ts", None)   # EntryStore rows: already parsed
+    if ts is not None:
+        dt = datetime.fromtimestamp(ts, tz=timezone.utc)
+    else:
+        dt = parse_published(entry.get("published_at"))
+    source = entry.get("source")
+    if dt is not None and source is not None:
+        if source not in newest or dt > newest[source]:
+            newest[source] = dt
+
+
+def newest_published(entries):
+    """Newest published_at of plain entry dicts as an aware datetime (None if none parse)."""
+    dates = [dt for dt in (parse_published(e.get("published_at")) for e in entries) if dt is not None]
+    return max(dates, default=None)
+
+
+def reached_watermark(entries, watermark, newest_first=False):
+    """
+    True once a fetched page holds nothing newer than `watermark`, so
+    deeper pages would only repeat items analyzed in an earlier run.
+
+    Newest-first listings stop at the first item at or below the
+    watermark; other orders (hot, votes) only when every dated item is.
+    """
+    if watermark is None:
+        return False
+    dates = [dt for dt in (parse_published(e.get("published_at")) for e in entries) if dt is not None]
+    if not dates:
+        return False
+    if newest_first:
+        return min(dates) <= watermark
+    return max(dates) <= watermark
+
+
+class SeenIndex:
+    """
+    Persistent record of already-ingested items and per-source watermarks.
+
+    Each item remembers the batch summary it was analyzed in, so a later run
+    only sends new items to the LLM and reuses earlier summaries for the rest.
+    Watermarks hold the newest `published_at` per source. (Conditional-GET
+    validators live with the cached bodies in http_client.)
+    """
+
+    def __init__(self, path=INDEX_PATH, retention=SUMMARY_RETENTION_SECONDS):
+        self.path = path
+        self.retention = retention
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS items (
+                    key TEXT PRIMARY KEY,
+                    source TEXT,
+                    published_at TEXT,
+                    first_seen REAL NOT NULL,
+                    summary_id INTEGER
+                );
+                CREATE TABLE IF NOT EXISTS summaries (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    created_at REAL NOT NULL,
+                    summary TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS watermarks (
+                    source TEXT PRIMARY KEY,
+                    published_at TEXT,
+                    fetched_at REAL
+                );
+                CREATE TABLE IF NOT EXISTS listings (
+                    key TEXT PRIMARY KEY,
+                    entries TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                );
+            """)
+        return self._conn
+
+    # ------------------------------
+    # ITEMS + SUMMARIES
+    # ------------------------------
+
+    def partition(self, entries, scope=None):
+        """
+        Split entries into (new_entries, reused_summaries).
+
+        An entry is "seen" when it was analyzed in a batch whose summary is
+        still within the retention window; each such summary is returned once,
+        oldest first. With `scope` (e.g. "DE,AT") only summaries recorded
+        under the same scope count, so a batch written for one set of
+        markets is never reused in another's report.
+        """
+        summary_ids = set()
+
+        def unseen(entry):
+            summary_id = self.summary_id_for(entry, scope)
+            if summary_id is not None:
+                summary_ids.add(summary_id)
+            return summary_id is None
+
+        # An EntryStore stays columnar; plain lists stay lists
+        select = getattr(entries, "select", None)
+        new_entries = select(unseen) if select else [e for e in entries if unseen(e)]
+
+        return new_entries, self.get_summaries(summary_ids)
+
+    def summary_id_for(self, entry, scope=None):
+        """Id of the still-retained summary that covered `entry`, or None if unseen."""
+        cutoff = time.time() - self.retention
+        with self._lock:
+            row = self._db().execute(
+                "SELECT s.id FROM items i JOIN summaries s ON s.id = i.summary_id "
+                "WHERE i.key = ? AND s.created_at >= ?",
+                (scoped_key(entry, scope), cutoff),
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_summaries(self, summary_ids):
+        """Summary texts for the given ids, oldest first."""
+        with self._lock:
+            db = self._db()
+            return [
+                db.execute("SELECT summary FROM summaries WHERE id = ?", (sid,)).fetchone()[0]
+                for sid in sorted(summary_ids)
+            ]
+
+    def record_batch(self, entries, summary, scope=None):
+        """Store a batch summary and mark its entries as analyzed."""
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            cur = db.execute(
+                "INSERT INTO summaries (created_at, summary) VALUES (?, ?)", (now, summary)
+            )
+            summary_id = cur.lastrowid
+            db.executemany(
+                "INSERT INTO items (key, source, published_at, first_seen, summary_id) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET summary_id = excluded.summary_id",
+                [
+                    (scoped_key(e, scope), e.get("source"), e.get("published_at"), now, summary_id)
+                    for e in entries
+                ],
+            )
+            db.execute("DELETE FROM summaries WHERE created_at < ?", (now - self.retention,))
+            db.commit()
+
+    # ------------------------------
+    # WATERMARKS
+    # ------------------------------
+
+    def get_watermark(self, source):
+        """Return {published_at, fetched_at} for a source (empty if unknown)."""
+        with self._lock:
+            row = self._db().execute(
+                "SELECT published_at, fetched_at FROM watermarks WHERE source = ?",
+                (source,),
+            ).fetchone()
+        if row is None:
+            return {}
+        return dict(zip(("published_at", "fetched_at"), row))
+
+    def set_watermark(self, source, published_at=None):
+        """Upsert a watermark; None keeps the stored published_at."""
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT INTO watermarks (source, published_at, fetched_at) "
+                "VALUES (?, ?, ?) "
+                "ON CONFLICT(source) DO UPDATE SET "
+                " published_at = COALESCE(excluded.published_at, published_at),"
+                " fetched_at = excluded.fetched_at",
+                (source, published_at, time.time()),
+            )
+            db.commit()
+
+    def update_published_watermarks(self, entries):
+        """Advance each source's published_at watermark to its newest entry."""
+        newest = {}
+        for e in entries:
+            track_newest(newest, e)
+        self.advance_watermarks(newest)
+
+    def advance_watermarks(self, newest):
+        """Apply a {source: datetime} map, only ever moving watermarks forward."""
+        for source, dt in newest.items():
+            current = parse_published(self.get_watermark(source).get("published_at"))
+            if current is None or dt > current:
+                self.set_watermark(source, published_at=dt.isoformat())
+
+    def published_watermark(self, source):
+        """The source's published_at watermark as a datetime (None if unknown)."""
+        return parse_published(self.get_watermark(source).get("published_at"))
+
+    # ------------------------------
+    # LISTINGS
+    # ------------------------------
+
+    def get_listing(self, key):
+        """Entries of the last fetch of a paginated listing (empty if unknown)."""
+        with self._lock:
+            row = self._db().execute("SELECT entries FROM listings WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else []
+
+    def set_listing(self, key, entries):
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO listings (key, entries, fetched_at) VALUES (?, ?, ?)",
+                (key, json.dumps([dict(e) for e in entries]), time.time()),
+            )
+            db.commit()
+
+
+# ------------------------------
+# FETCH WATERMARKS
+# ------------------------------
+
+# Paginating fetchers keep their own watermark per request (e.g. one per
+# NewsAPI query and language) under this prefix, in the shared index
+FETCH_WATERMARK_PREFIX = "fetch:"
+
+_fetch_index = None
+_fetch_index_lock = threading.Lock()
+
+
+def fetch_index():
+    """Process-wide SeenIndex used by fetchers for pagination watermarks."""
+    global _fetch_index
+    with _fetch_index_lock:
+        if _fetch_index is None:
+            _fetch_index = SeenIndex()
+        return _fetch_index
+
+
+def fetch_watermark(key):
+    return fetch_index().published_watermark(FETCH_WATERMARK_PREFIX + key)
+
+
+def advance_fetch_watermark(key, entries):
+    """Move the fetch watermark of `key` up to the newest of `entries`."""
+    newest = newest_published(entries)
+    if newest is not None:
+        fetch_index().advance_watermarks({FETCH_WATERMARK_PREFIX + key: newest})
+
+
+def finish_listing(key, fetched, stopped, max_items, max_age=None):
+    """
+    Record a paginated fetch of `key`; returns the entries early stop skipped.
+
+    When paging `stopped` at the fetch watermark, the deeper pages would
+    have repeated items of the previous fetch. Those are returned from the
+    retained listing (in listing order, up to `max_items` in total, none
+    older than `max_age` seconds) marked "retained", so the run still sees
+    the whole listing: their seen summaries are reused, they keep counting
+    in scores and trend history, and the daemon window keeps them.
+    """
+    index = fetch_index()
+    tail = []
+    if stopped:
+        have = {entry_key(e) for e in fetched}
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=max_age) if max_age else None
+        for entry in index.get_listing(key):
+            if len(fetched) + len(tail) >= max_items:
+                break
+            published = parse_published(entry.get("published_at"))
+            if entry_key(entry) in have or (cutoff and published and published < cutoff):
+                continue
+            entry["retained"] = True
+            tail.append(entry)
+
+    index.set_listing(key, list(fetched) + tail)
+    advance_fetch_watermark(key, fetched)
+    return tail
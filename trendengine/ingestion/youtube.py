@@ -1,12 +1,10 @@
 import requests
-import os
-from dotenv import load_dotenv
 
-load_dotenv()
+from config import YOUTUBE_API_KEY
+from ingestion import http_client
 
-YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
-
-SEARCH_URL = "https://www.googleapis.com/youtube/v3/search"
+YOUTUBE_HOST = "www.googleapis.com"
+SEARCH_URL = f"https://{YOUTUBE_HOST}/youtube/v3/search"
 
 REVIEW_KEYWORDS = [
     "tech review",
@@ -22,19 +20,18 @@ REVIEW_KEYWORDS = [
 # YOUTUBE TRENDING VIA INVIDIOUS API
 # -----------------------------------
 
-def fetch_youtube_trending(region="DE"):
+def iter_youtube_trending(region="DE"):
     """
-    Fetch trending videos from YouTube using YouTube Data API.
+    Yield trending videos from YouTube using YouTube Data API.
     
     Args:
         region: ISO 3166-1 alpha-2 country code (default: DE for Germany)
     """
     print(f"📺 Fetching YouTube Trending for {region}…")
-    items = []
     
     if not YOUTUBE_API_KEY:
         print("❌ No YOUTUBE_API_KEY available")
-        return items
+        return
     
     try:
         # YouTube Data API "most popular" videos (trending)
@@ -46,41 +43,117 @@ def fetch_youtube_trending(region="DE"):
             "key": YOUTUBE_API_KEY,
         }
         
-        url = "https://www.googleapis.com/youtube/v3/videos"
-        r = requests.get(url, params=params, timeout=10)
+        url = f"https://{YOUTUBE_HOST}/youtube/v3/videos"
+        r = http_client.get(url, params=params, conditional=True)
         r.raise_for_status()
         data = r.json()
         
         if "error" in data:
             print(f"❌ YouTube API Error: {data['error'].get('message', 'Unknown error')}")
-            return items
+            return
         
+        count = 0
         for item in data.get("items", []):
             snippet = item.get("snippet", {})
             video_id = item.get("id")
             
-            items.append({
+            count += 1
+            yield {
                 "source": "youtube_trending",
                 "title": snippet.get("title"),
                 "text": snippet.get("description"),
                 "url": f"https://www.youtube.com/watch?v={video_id}",
                 "published_at": snippet.get("publishedAt")
-            })
+            }
         
         print(f"✅ Successfully fetched from YouTube Data API")
-        print(f"Trending videos collected: {len(items)}")
-        return items
+        print(f"Trending videos collected: {count}")
         
     except Exception as e:
         print(f"❌ YouTube Data API failed: {e}")
+
+
+def fetch_youtube_trending(region="DE"):
+    """
+    Fetch trending videos from YouTube using YouTube Data API.
     
-    return items
+    Args:
+        region: ISO 3166-1 alpha-2 country code (default: DE for Germany)
+    """
+    return list(iter_youtube_trending(region))
 
 
 # -----------------------------------
 # YOUTUBE REVIEWS (OFFICIAL API)
 # -----------------------------------
 
+def iter_youtube_review_keyword(kw, max_results=25):
+    """
+    Yield review videos matching a single keyword as they are parsed.
+
+    Args:
+        kw: Search keyword
+        max_results: Maximum results for this keyword
+    """
+    if not YOUTUBE_API_KEY:
+        return
+
+    params = {
+        "part": "snippet",
+        "q": kw,
+        "maxResults": max_results,
+        "type": "video",
+        "key": YOUTUBE_API_KEY,
+    }
+
+    try:
+        print(f"  Searching for: {kw}")
+        r = http_client.get(SEARCH_URL, params=params, conditional=True)
+        r.raise_for_status()
+        data = r.json()
+        
+        # Check for API errors
+        if "error" in data:
+            error_msg = data["error"].get("message", "Unknown error")
+            error_code = data["error"].get("code", "N/A")
+            print(f"  ❌ API Error ({error_code}): {error_msg}")
+            return
+
+        result_count = len(data.get("items", []))
+        print(f"  Found {result_count} videos for '{kw}'")
+
+        for item in data.get("items", []):
+            snippet = item.get("snippet", {})
+            video_id = item.get("id", {}).get("videoId")
+            
+            if not video_id:
+                continue
+
+            yield {
+                "source": f"youtube_review:{kw}",
+                "title": snippet.get("title"),
+                "text": snippet.get("description"),
+                "url": f"https://www.youtube.com/watch?v={video_id}",
+                "published_at": snippet.get("publishedAt"),
+            }
+
+    except requests.exceptions.HTTPError as e:
+        print(f"  ❌ HTTP Error for '{kw}': {e}")
+    except Exception as e:
+        print(f"  ❌ Error for '{kw}': {e}")
+
+
+def fetch_youtube_review_keyword(kw, max_results=25):
+    """
+    Search YouTube for review videos matching a single keyword.
+
+    Args:
+        kw: Search keyword
+        max_results: Maximum results for this keyword
+    """
+    return list(iter_youtube_review_keyword(kw, max_results))
+
+
 def fetch_youtube_reviews(max_results=25):
     """
     Fetch YouTube reviews using YouTube Data API.
@@ -97,49 +170,7 @@ def fetch_youtube_reviews(max_results=25):
     items = []
 
     for kw in REVIEW_KEYWORDS:
-        params = {
-            "part": "snippet",
-            "q": kw,
-            "maxResults": max_results,
-            "type": "video",
-            "key": YOUTUBE_API_KEY,
-        }
-
-        try:
-            print(f"  Searching for: {kw}")
-            r = requests.get(SEARCH_URL, params=params, timeout=10)
-            r.raise_for_status()
-            data = r.json()
-            
-            # Check for API errors
-            if "error" in data:
-                error_msg = data["error"].get("message", "Unknown error")
-                error_code = data["error"].get("code", "N/A")
-                print(f"  ❌ API Error ({error_code}): {error_msg}")
-                continue
-
-            result_count = len(data.get("items", []))
-            print(f"  Found {result_count} videos for '{kw}'")
-
-            for item in data.get("items", []):
-                snippet = item.get("snippet", {})
-                video_id = item.get("id", {}).get("videoId")
-                
-                if not video_id:
-                    continue
-
-                items.append({
-                    "source": f"youtube_review:{kw}",
-                    "title": snippet.get("title"),
-                    "text": snippet.get("description"),
-                    "url": f"https://www.youtube.com/watch?v={video_id}",
-                    "published_at": snippet.get("publishedAt"),
-                })
-
-        except requests.exceptions.HTTPError as e:
-            print(f"  ❌ HTTP Error for '{kw}': {e}")
-        except Exception as e:
-            print(f"  ❌ Error for '{kw}': {e}")
+        items.extend(fetch_youtube_review_keyword(kw, max_results))
 
     print(f"YouTube reviews collected: {len(items)}")
     return items
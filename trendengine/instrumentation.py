@@ -0,0 +1,172 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from config import env
+
+# ------------------------------
+# METRICS CONFIG
+# ------------------------------
+
+METRICS_PATH = env("TREND_METRICS_PATH", "trend_metrics.jsonl")
+
+# USD per 1M (prompt, completion) tokens
+MODEL_PRICES_PER_1M = {
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gemini-2.5-pro": (1.25, 10.00),
+    "gemini-2.5-flash": (0.30, 2.50),
+}
+
+COUNTERS = ("bytes", "requests", "not_modified", "items", "retries",
+            "prompt_tokens", "completion_tokens", "cost_usd", "cache_hits")
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    prices = MODEL_PRICES_PER_1M.get(model)
+    if prices is None:
+        return 0.0
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000
+
+
+class Span:
+    """One timed unit of work (a fetch, an LLM call, a pipeline stage)."""
+
+    __slots__ = ("name", "kind", "attrs", "counters", "started", "wall_ms", "error")
+
+    def __init__(self, name, kind, attrs):
+        self.name = name
+        self.kind = kind
+        self.attrs = attrs
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.started = time.time()
+        self.wall_ms = None
+        self.error = None
+
+    def add(self, **counters):
+        for key, value in counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self):
+        return {
+            "type": "span",
+            "name": self.name,
+            "kind": self.kind,
+            "start": datetime.fromtimestamp(self.started, tz=timezone.utc).isoformat(),
+            "wall_ms": self.wall_ms,
+            **{k: v for k, v in self.counters.items() if v},
+            **self.attrs,
+            **({"error": self.error} if self.error else {}),
+        }
+
+
+class Recorder:
+    """
+    Collects spans from all threads, appends each finished span to a JSON
+    lines file and prints a per-kind summary at the end of a run.
+
+    Spans nest per thread; counters reported with `add()` (bytes from the
+    HTTP client, token usage from LLM calls) go to the innermost open span.
+    """
+
+    def __init__(self, path=METRICS_PATH):
+        self.path = path
+        self.run_id = None
+        self.spans = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def start_run(self, run_id=None):
+        self.run_id = run_id or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        self.spans = []
+        return self.run_id
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def current(self):
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def span(self, name, kind, **attrs):
+        s = Span(name, kind, attrs)
+        stack = self._stack()
+        stack.append(s)
+        started = time.perf_counter()
+        try:
+            yield s
+        except BaseException as e:
+            s.error = repr(e)
+            raise
+        finally:
+            s.wall_ms = round((time.perf_counter() - started) * 1000, 1)
+            stack.pop()
+            self._finish(s)
+
+    def add(self, **counters):
+        """Add counters to the innermost open span of this thread (no-op outside spans)."""
+        s = self.current()
+        if s is not None:
+            s.add(**counters)
+
+    def record_usage(self, model, prompt_tokens, completion_tokens):
+        self.add(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cost_usd=estimate_cost(model, prompt_tokens, completion_tokens),
+        )
+
+    def _write(self, record):
+        if not self.path:
+            return
+        record = {"run_id": self.run_id, **record}
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+
+    def _finish(self, s):
+        with self._lock:
+            self.spans.append(s)
+            self._write(s.to_dict())
+
+    def summary(self):
+        """Aggregate finished spans by kind (pipeline stages individually)."""
+        kinds = {}
+        for s in self.spans:
+            key = f"{s.kind}:{s.name}" if s.kind == "stage" else s.kind
+            agg = kinds.setdefault(key, {"count": 0, "wall_ms": 0.0, "max_ms": 0.0, "errors": 0,
+                                            **dict.fromkeys(COUNTERS, 0)})
+            agg["count"] += 1
+            agg["wall_ms"] += s.wall_ms or 0
+            agg["max_ms"] = max(agg["max_ms"], s.wall_ms or 0)
+            agg["errors"] += 1 if s.error else 0
+            for counter, value in s.counters.items():
+                agg[counter] = agg.get(counter, 0) + value
+        return kinds
+
+    def print_summary(self):
+        kinds = self.summary()
+        with self._lock:
+            self._write({"type": "summary", "kinds": kinds})
+
+        print("\n📊 Run metrics")
+        print(f"{'kind':<16}{'count':>7}{'wall s':>9}{'max s':>8}{'KB':>9}"
+              f"{'items':>8}{'retries':>8}{'tok in':>9}{'tok out':>9}{'cost $':>9}")
+        for kind, a in sorted(kinds.items(), key=lambda kv: -kv[1]["wall_ms"]):
+            print(f"{kind:<16}{a['count']:>7}{a['wall_ms'] / 1000:>9.1f}{a['max_ms'] / 1000:>8.1f}"
+                  f"{a['bytes'] / 1024:>9.0f}{a['items']:>8}{a['retries']:>8}"
+                  f"{a['prompt_tokens']:>9}{a['completion_tokens']:>9}{a['cost_usd']:>9.4f}")
+        if self.path:
+            print(f"Spans written to {self.path}")
+
+
+# Shared recorder used across ingestion, LLM calls and pipeline stages
+recorder = Recorder()
+span = recorder.span
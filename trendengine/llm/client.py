@@ -0,0 +1,376 @@
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from config import OPENAI_API_KEY, GEMINI_API_KEY
+from instrumentation import estimate_cost
+from llm.cache import llm_cache
+from llm import replay as llm_replay
+
+# ------------------------------
+# CLIENT CONFIG
+# ------------------------------
+
+ATTEMPTS_PER_PROVIDER = 3
+RETRY_BASE_DELAY = 2        # seconds; doubles per attempt, jittered
+RETRY_MAX_DELAY = 60
+
+# A call running longer than this counts as stalled and is retried / failed over
+ATTEMPT_TIMEOUT_SECONDS = 180
+ATTEMPT_TIMEOUTS = {
+    "gpt-4.1-mini": 60,
+    "gemini-2.5-flash": 60,
+}
+
+# Hedged requests: start the next provider if the first has not answered by then
+HEDGE_DELAY_SECONDS = 20
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """Every provider on a route failed."""
+
+
+def _status_code(e):
+    for attr in ("status_code", "code"):
+        value = getattr(e, attr, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_retryable(e):
+    """Rate limits, server errors, timeouts and dropped connections are worth retrying."""
+    if isinstance(e, (asyncio.TimeoutError, ConnectionError, llm_replay.InjectedLLMError)):
+        return True
+    status = _status_code(e)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    name = type(e).__name__
+    return "Timeout" in name or "Connection" in name
+
+
+def retry_after(e):
+    """Seconds the server asked us to wait (Retry-After / retry-after-ms), or None."""
+    headers = getattr(getattr(e, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, error=None):
+    """Exponential backoff with equal jitter, never shorter than a Retry-After hint."""
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)
+    delay = delay / 2 + random.uniform(0, delay / 2)
+    hinted = retry_after(error) if error is not None else None
+    return max(delay, hinted) if hinted is not None else delay
+
+
+def _record_usage(span, model, prompt_tokens, completion_tokens):
+    # Runs on the client's loop thread, so the caller's span is passed in explicitly
+    if span is not None:
+        span.add(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cost_usd=estimate_cost(model, prompt_tokens, completion_tokens),
+        )
+
+
+class LLMClient:
+    """
+    One asyncio client for every LLM call, running on a background event
+    loop thread so existing worker threads can use it synchronously.
+
+    A route is an ordered list of (provider, model) pairs. Each provider is
+    retried with exponential backoff (honouring Retry-After) and a per-call
+    stall timeout before the route fails over to the next one. The OpenAI
+    client and Gemini model objects are created once and reused.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._lock = threading.Lock()
+        self._openai = None
+        self._gemini_models = {}
+
+    # ------------------------------
+    # EVENT LOOP
+    # ------------------------------
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="llm-client", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def run(self, coro):
+        """Run a coroutine on the client's loop from any thread and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop()).result()
+
+    # ------------------------------
+    # PROVIDERS
+    # ------------------------------
+
+    # Provider SDKs are imported on first use: together they take most of a
+    # second to import, and a run may only ever need one of them
+
+    def _openai_client(self):
+        if self._openai is None:
+            from openai import AsyncOpenAI
+            # Retries are ours (backoff + failover), not the SDK's
+            self._openai = AsyncOpenAI(api_key=OPENAI_API_KEY, max_retries=0)
+        return self._openai
+
+    def _gemini_model(self, model):
+        if model not in self._gemini_models:
+            import google.generativeai as genai
+            if not self._gemini_models:
+                genai.configure(api_key=GEMINI_API_KEY)
+            self._gemini_models[model] = genai.GenerativeModel(model)
+        return self._gemini_models[model]
+
+    async def _openai_stream(self, model, prompt, span, on_token):
+        stream = await self._openai_client().responses.create(model=model, input=prompt, stream=True)
+        parts = []
+        async for event in stream:
+            if event.type == "response.output_text.delta":
+                parts.append(event.delta)
+                on_token(event.delta)
+            elif event.type == "response.completed":
+                usage = getattr(event.response, "usage", None)
+                if usage is not None:
+                    _record_usage(span, model, usage.input_tokens, usage.output_tokens)
+        return "".join(parts)
+
+    async def _gemini_stream(self, model, prompt, span, on_token):
+        response = await self._gemini_model(model).generate_content_async(prompt, stream=True)
+        parts = []
+        async for chunk in response:
+            parts.append(chunk.text)
+            on_token(chunk.text)
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            _record_usage(span, model, usage.prompt_token_count, usage.candidates_token_count)
+        return "".join(parts)
+
+    async def _call(self, provider, model, prompt, span, on_token=None):
+        async def live():
+            if on_token is not None:
+                stream = self._openai_stream if provider == "openai" else self._gemini_stream
+                return await stream(model, prompt, span, on_token)
+
+            if provider == "openai":
+                resp = await self._openai_client().responses.create(model=model, input=prompt)
+                usage = getattr(resp, "usage", None)
+                if usage is not None:
+                    _record_usage(span, model, usage.input_tokens, usage.output_tokens)
+                return resp.output_text
+
+            response = await self._gemini_model(model).generate_content_async(prompt)
+            usage = getattr(response, "usage_metadata", None)
+            if usage is not None:
+                _record_usage(span, model, usage.prompt_token_count, usage.candidates_token_count)
+            return response.text
+
+        return await llm_replay.acall(model, prompt, live, on_token=on_token)
+
+    async def _with_retries(self, provider, model, prompt, span, rate_limiter, tokens, attempts,
+                            on_token=None, on_restart=None):
+        timeout = ATTEMPT_TIMEOUTS.get(model, ATTEMPT_TIMEOUT_SECONDS)
+        for attempt in range(attempts):
+            if rate_limiter is not None:
+                await rate_limiter.acquire_async(tokens)
+            emitted = []
+
+            def emit(delta):
+                emitted.append(True)
+                on_token(delta)
+
+            try:
+                call = self._call(provider, model, prompt, span, emit if on_token else None)
+                return await asyncio.wait_for(call, timeout)
+            except Exception as e:
+                print(f"⚠️ {model} failed attempt {attempt+1}: {e!r}")
+                if emitted and on_restart is not None:
+                    on_restart(f"{model} failed mid-stream")
+                if not is_retryable(e) or attempt == attempts - 1:
+                    raise
+                if span is not None:
+                    span.add(retries=1)
+                await asyncio.sleep(backoff_delay(attempt, e))
+
+    # ------------------------------
+    # PUBLIC API
+    # ------------------------------
+
+    def cached(self, prompt, route):
+        """(model, text) of a cached answer from any model on the route, else None."""
+        for _, model in route:
+            text = llm_cache.get(model, prompt)
+            if text is not None:
+                return model, text
+        return None
+
+    async def complete(self, prompt, route, span=None, rate_limiters=None, tokens=0,
+                       attempts=ATTEMPTS_PER_PROVIDER, use_cache=True, on_token=None, on_restart=None):
+        """
+        Answer `prompt` from the first provider on `route` that succeeds.
+
+        Returns (model, text). `rate_limiters` maps model names to a shared
+        RateLimiter charged `tokens` per attempt. Raises LLMError when every
+        provider has failed.
+
+        With `on_token(delta)` the answer is streamed as it is generated
+        (cache hits are returned whole, without callbacks). If an attempt
+        fails after streaming part of an answer, `on_restart(reason)` is
+        called before the retry or failover streams it again from the top.
+        """
+        if use_cache:
+            hit = self.cached(prompt, route)
+            if hit is not None:
+                if span is not None:
+                    span.add(cache_hits=1)
+                return hit
+
+        errors = []
+        for i, (provider, model) in enumerate(route):
+            limiter = (rate_limiters or {}).get(model)
+            try:
+                text = await self._with_retries(provider, model, prompt, span, limiter, tokens, attempts,
+                                                on_token, on_restart)
+            except Exception as e:
+                errors.append(f"{model}: {e!r}")
+                if i + 1 < len(route):
+                    print(f"↪️ Failing over from {model} to {route[i + 1][1]}")
+                continue
+            llm_cache.set(model, prompt, text)
+            return model, text
+        raise LLMError("; ".join(errors))
+
+    async def complete_hedged(self, prompt, route, span=None, hedge_after=HEDGE_DELAY_SECONDS,
+                              on_token=None, on_restart=None, **kwargs):
+        """
+        `complete` that races the rest of the route against a slow first provider.
+
+        The first provider gets a head start of `hedge_after` seconds; if it
+        has neither answered nor (when streaming) started streaming by then,
+        or has already failed, the remaining providers start as a backup.
+        The first answer wins and the other request is cancelled, so one
+        stalled vendor call no longer sets the run time. When streaming, the
+        first racer to produce a token owns the stream and the other is
+        cancelled at that point; if the owner then fails, the cancelled
+        route is restarted as a plain failover.
+        """
+        hit = self.cached(prompt, route)
+        if hit is not None:
+            if span is not None:
+                span.add(cache_hits=1)
+            return hit
+        if len(route) < 2:
+            return await self.complete(prompt, route, span, use_cache=False,
+                                       on_token=on_token, on_restart=on_restart, **kwargs)
+
+        racers, routes = {}, {}
+        owner = []
+        streaming = asyncio.Event()
+
+        def callbacks(name):
+            if on_token is None:
+                return {}
+
+            def emit(delta):
+                if not owner:
+                    owner.append(name)
+                    streaming.set()
+                    for other, task in racers.items():
+                        if other != name:
+                            task.cancel()
+                if owner[0] == name:
+                    on_token(delta)
+
+            def restart(reason):
+                if owner and owner[0] == name:
+                    owner.clear()
+                    if on_restart is not None:
+                        on_restart(reason)
+
+            return {"on_token": emit, "on_restart": restart}
+
+        def race(name, providers):
+            routes[name] = providers
+            racers[name] = asyncio.ensure_future(
+                self.complete(prompt, providers, span, use_cache=False, **callbacks(name), **kwargs)
+            )
+            return racers[name]
+
+        primary = race("primary", route[:1])
+        started = asyncio.ensure_future(streaming.wait())
+        await asyncio.wait({primary, started}, timeout=hedge_after, return_when=asyncio.FIRST_COMPLETED)
+        started.cancel()
+
+        if primary.done() and primary.exception() is None:
+            return primary.result()
+        if owner:
+            # Primary is already streaming: let it finish, fail over only if it breaks
+            try:
+                return await primary
+            except LLMError as e:
+                print(f"↪️ Failing over from {route[0][1]} to {route[1][1]}")
+                try:
+                    return await self.complete(prompt, route[1:], span, use_cache=False,
+                                               on_token=on_token, on_restart=on_restart, **kwargs)
+                except LLMError as backup_error:
+                    raise LLMError(f"{e}; {backup_error}")
+
+        print(f"🏁 Hedging {route[0][1]} with {route[1][1]}")
+        backup = race("backup", route[1:])
+        pending = {backup} if primary.done() else {primary, backup}
+        errors = [str(primary.exception())] if primary.done() else []
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.cancelled():
+                        continue
+                    if task.exception() is None:
+                        return task.result()
+                    errors.append(str(task.exception()))
+        finally:
+            for task in pending:
+                task.cancel()
+
+        # The stream owner cancelled the other racer and then failed
+        for name, task in racers.items():
+            if task.cancelled():
+                print(f"↪️ Failing over to {routes[name][0][1]}")
+                try:
+                    return await self.complete(prompt, routes[name], span, use_cache=False,
+                                               on_token=on_token, on_restart=on_restart, **kwargs)
+                except LLMError as e:
+                    errors.append(str(e))
+        raise LLMError("; ".join(errors))
+
+    def complete_sync(self, prompt, route, hedged=False, **kwargs):
+        """Blocking `complete` / `complete_hedged` for callers on ordinary threads."""
+        if hedged:
+            return self.run(self.complete_hedged(prompt, route, **kwargs))
+        return self.run(self.complete(prompt, route, **kwargs))
+
+
+# Shared client used by the pipeline
+llm_client = LLMClient()
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+WINDOW_SECONDS = 60.0
+
+
+class RateLimiter:
+    """
+    Sliding one-minute window limiter for requests-per-minute and
+    tokens-per-minute budgets, safe to share between worker threads.
+
+    `acquire(tokens)` blocks until one more request of `tokens` size fits
+    in both budgets. A limit of None disables that budget.
+    """
+
+    def __init__(self, rpm=None, tpm=None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._events = deque()   # (timestamp, tokens)
+        self._tokens_in_window = 0
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        while self._events and now - self._events[0][0] >= WINDOW_SECONDS:
+            _, tokens = self._events.popleft()
+            self._tokens_in_window -= tokens
+
+    def _wait_time(self, now, tokens):
+        wait = 0.0
+        if self.rpm is not None and len(self._events) >= self.rpm:
+            wait = max(wait, self._events[0][0] + WINDOW_SECONDS - now)
+        if self.tpm is not None and self._events:
+            # Oversized single requests are let through once the window is empty
+            excess = self._tokens_in_window + tokens - self.tpm
+            if excess > 0:
+                freed = 0
+                for ts, t in self._events:
+                    freed += t
+                    if freed >= excess:
+                        wait = max(wait, ts + WINDOW_SECONDS - now)
+                        break
+                else:
+                    wait = max(wait, self._events[-1][0] + WINDOW_SECONDS - now)
+        return wait
+
+    def _try_acquire(self, tokens):
+        """Take the slot and return 0, or return how long to wait before retrying."""
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            wait = self._wait_time(now, tokens)
+            if wait <= 0:
+                self._events.append((now, tokens))
+                self._tokens_in_window += tokens
+                return 0
+            return min(wait, WINDOW_SECONDS)
+
+    def acquire(self, tokens=0):
+        while True:
+            wait = self._try_acquire(tokens)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens=0):
+        """`acquire` for coroutines: waits without blocking the event loop."""
+        while True:
+            wait = self._try_acquire(tokens)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import os
+import random
+
+from config import env
+from llm.cache import cache_key
+
+# ------------------------------
+# REPLAY CONFIG
+# ------------------------------
+
+# "live" (default), "record" or "replay"
+LLM_MODE = env("LLM_MODE", "live")
+LLM_FIXTURE_DIR = env("LLM_FIXTURE_DIR", os.path.join("fixtures", "llm"))
+LLM_REPLAY_LATENCY_MS = float(env("LLM_REPLAY_LATENCY_MS", 0))
+LLM_REPLAY_ERROR_RATE = float(env("LLM_REPLAY_ERROR_RATE", 0))
+# In replay mode, prompts without a recorded fixture get a synthetic answer
+LLM_REPLAY_SYNTHETIC = True
+
+
+class InjectedLLMError(Exception):
+    """Failure injected by replay mode to exercise retry and failover paths."""
+
+
+def configure(mode=None, fixture_dir=None, latency_ms=None, error_rate=None, synthetic=None):
+    global LLM_MODE, LLM_FIXTURE_DIR, LLM_REPLAY_LATENCY_MS, LLM_REPLAY_ERROR_RATE, LLM_REPLAY_SYNTHETIC
+    if mode is not None:
+        LLM_MODE = mode
+    if fixture_dir is not None:
+        LLM_FIXTURE_DIR = fixture_dir
+    if latency_ms is not None:
+        LLM_REPLAY_LATENCY_MS = latency_ms
+    if error_rate is not None:
+        LLM_REPLAY_ERROR_RATE = error_rate
+    if synthetic is not None:
+        LLM_REPLAY_SYNTHETIC = synthetic
+
+
+def _fixture_path(model, prompt):
+    return os.path.join(LLM_FIXTURE_DIR, cache_key(model, prompt)[:32] + ".json")
+
+
+def synthetic_response(model, prompt):
+    """Deterministic stand-in answer, roughly the size of a real batch summary."""
+    key = cache_key(model, prompt)[:12]
+    lines = [line[2:] for line in prompt.splitlines() if line.startswith("- ")][:8]
+    bullets = "\n".join(f"- Trend signal: {line[:80]}" for line in lines)
+    return f"[synthetic {model} {key}]\nKey emerging trends:\n{bullets}\nSentiment: mixed\n"
+
+
+def _save_fixture(model, prompt, text):
+    os.makedirs(LLM_FIXTURE_DIR, exist_ok=True)
+    with open(_fixture_path(model, prompt), "w", encoding="utf-8") as f:
+        json.dump({"model": model, "key": cache_key(model, prompt), "response": text}, f)
+
+
+def _replayed(model, prompt):
+    if LLM_REPLAY_ERROR_RATE and random.random() < LLM_REPLAY_ERROR_RATE:
+        raise InjectedLLMError(f"injected {model} failure")
+
+    try:
+        with open(_fixture_path(model, prompt), encoding="utf-8") as f:
+            return json.load(f)["response"]
+    except OSError:
+        if LLM_REPLAY_SYNTHETIC:
+            return synthetic_response(model, prompt)
+        raise InjectedLLMError(f"no {model} fixture recorded for this prompt")
+
+
+async def acall(model, prompt, live_fn, on_token=None):
+    """
+    Run one LLM request according to LLM_MODE.
+
+    `live_fn()` performs the real vendor call and returns an awaitable of
+    the response text. "record" saves that text as a fixture; "replay"
+    never touches the network and answers from fixtures with configurable
+    latency and errors.
+
+    With `on_token`, live_fn streams on its own; replayed answers are fed to
+    the callback line by line, with the latency spread across them.
+    """
+    if LLM_MODE == "live":
+        return await live_fn()
+
+    if LLM_MODE == "record":
+        text = await live_fn()
+        _save_fixture(model, prompt, text)
+        return text
+
+    if on_token is None:
+        if LLM_REPLAY_LATENCY_MS:
+            await asyncio.sleep(LLM_REPLAY_LATENCY_MS / 1000)
+        return _replayed(model, prompt)
+
+    text = _replayed(model, prompt)
+    lines = text.splitlines(keepends=True) or [text]
+    for line in lines:
+        if LLM_REPLAY_LATENCY_MS:
+            await asyncio.sleep(LLM_REPLAY_LATENCY_MS / 1000 / len(lines))
+        on_token(line)
+    return text
@@ -0,0 +1,83 @@
+import sys
+
+# ------------------------------
+# REPORT STREAM CONFIG
+# ------------------------------
+
+REPORT_PATH = "trend_report_optimized.txt"
+
+BANNER = "\n====================== FINAL TREND REPORT ======================\n"
+FOOTER = "\n===============================================================\n"
+
+
+class ReportStream:
+    """
+    Tees the final report to stdout, the report file and an optional
+    `on_token(delta)` callback while the refinement model generates it.
+
+    Every delta is flushed to disk as it arrives, so a run that dies
+    mid-stream still leaves the report so far in REPORT_PATH. `restart()`
+    is called when the client retries or fails over after streaming part
+    of an answer; the new answer replaces the old one once its first
+    token arrives, so if every retry fails the last partial report stays.
+    """
+
+    def __init__(self, path=REPORT_PATH, on_token=None, echo=True):
+        self.path = path
+        self.on_token = on_token
+        self.echo = echo
+        self._parts = []
+        self._file = None
+        self._stale = False
+
+    @property
+    def text(self):
+        return "".join(self._parts)
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, "w", encoding="utf-8")
+            if self.echo:
+                print(BANNER)
+
+    def write(self, delta):
+        if not delta:
+            return
+        self._open()
+        if self._stale:
+            self._stale = False
+            self._parts = []
+            self._file.seek(0)
+            self._file.truncate()
+        self._parts.append(delta)
+        self._file.write(delta)
+        self._file.flush()
+        if self.echo:
+            sys.stdout.write(delta)
+            sys.stdout.flush()
+        if self.on_token is not None:
+            self.on_token(delta)
+
+    def restart(self, reason):
+        print(f"\n🔁 Report stream restarted ({reason})\n")
+        self._stale = bool(self._parts)
+
+    def finish(self, final_report):
+        """
+        Close the report. Cached answers arrive whole and are written here;
+        if refinement failed after streaming started, the partial report is
+        kept and the error appended to it.
+        """
+        streamed = self.text
+        self._stale = False
+        if not streamed:
+            self.write(final_report)
+        elif final_report != streamed:
+            self.write(f"\n\n[Report incomplete: {final_report}]\n")
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.echo:
+            print(FOOTER)
+        print(f"Saved to {self.path}")
+        return self.text